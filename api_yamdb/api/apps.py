@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_search_tables(sender, using, **kwargs):
+    from .search import create_sqlite_search_tables
+
+    create_sqlite_search_tables(using)
 
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(create_search_tables, sender=self)
@@ -0,0 +1,155 @@
+from django.db import connections, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.relations import SlugRelatedField
+
+from reviews.models import Category, Genre, GenreTitle, Title
+from .cache import bump_versions
+from .serializers import TitleBulkSerializer, TitleSerializer
+
+MESSAGE_TITLE_NOT_FOUND = "Произведение с id={value} не найдено."
+MESSAGE_ID_REQUIRED = "Укажите id произведения."
+TITLE_FIELDS = ("name", "year", "description")
+
+
+def _does_not_exist(value):
+    return str(SlugRelatedField.default_error_messages["does_not_exist"]
+               ).format(slug_name="slug", value=value)
+
+
+class BulkTitleWriter:
+    """Создание или изменение пакета произведений за один проход.
+
+    Каждый элемент проверяется отдельно, а слаги, id и связи с жанрами
+    читаются и пишутся одним запросом на весь пакет. Элементы с ошибками
+    пропускаются, остальные сохраняются в одной транзакции.
+    """
+
+    def __init__(self, items, partial=False):
+        self.items = items
+        self.partial = partial
+        self.results = [None] * len(items)
+
+    def fail(self, index, errors):
+        self.results[index] = {
+            "status": status.HTTP_400_BAD_REQUEST, "errors": errors,
+        }
+
+    def validate(self):
+        valid = {}
+        for index, item in enumerate(self.items):
+            serializer = TitleBulkSerializer(data=item, partial=self.partial)
+            if not serializer.is_valid():
+                self.fail(index, serializer.errors)
+            elif self.partial and "id" not in serializer.validated_data:
+                self.fail(index, {"id": [MESSAGE_ID_REQUIRED]})
+            else:
+                valid[index] = serializer.validated_data
+        return valid
+
+    def lookup(self, valid):
+        """Категории, жанры и изменяемые произведения пакета."""
+        category_slugs = {
+            data["category"] for data in valid.values() if "category" in data
+        }
+        genre_slugs = {
+            slug for data in valid.values() for slug in data.get("genre", ())
+        }
+        self.categories = Category.objects.in_bulk(
+            category_slugs, field_name="slug"
+        )
+        self.genres = Genre.objects.in_bulk(genre_slugs, field_name="slug")
+        self.titles = {}
+        if self.partial:
+            self.titles = Title.objects.in_bulk(
+                {data["id"] for data in valid.values()}
+            )
+
+    def check(self, data):
+        errors = {}
+        category = data.get("category")
+        if category is not None and category not in self.categories:
+            errors["category"] = [_does_not_exist(category)]
+        missing = [
+            slug for slug in data.get("genre", ()) if slug not in self.genres
+        ]
+        if missing:
+            errors["genre"] = [_does_not_exist(slug) for slug in missing]
+        if self.partial and data["id"] not in self.titles:
+            errors["id"] = [MESSAGE_TITLE_NOT_FOUND.format(value=data["id"])]
+        return errors
+
+    def build(self, data):
+        title = self.titles.get(data.get("id")) or Title()
+        for field in TITLE_FIELDS:
+            if field in data:
+                setattr(title, field, data[field])
+        if "category" in data:
+            title.category = self.categories[data["category"]]
+        genre_ids = None
+        if "genre" in data:
+            genre_ids = {self.genres[slug].pk for slug in data["genre"]}
+        return title, genre_ids
+
+    def resolve(self, valid):
+        self.lookup(valid)
+        resolved = {}
+        for index, data in valid.items():
+            errors = self.check(data)
+            if errors:
+                self.fail(index, errors)
+            else:
+                resolved[index] = self.build(data)
+        return resolved
+
+    def save(self):
+        resolved = self.resolve(self.validate())
+        if not resolved:
+            return self.results
+        titles = [title for title, _ in resolved.values()]
+        with transaction.atomic():
+            if self.partial:
+                self.update(titles)
+            else:
+                self.create(titles)
+            self.set_genres(resolved.values())
+        bump_versions("titles")
+        prefetch_related_objects(titles, "genre")
+        code = status.HTTP_200_OK if self.partial else status.HTTP_201_CREATED
+        for index, (title, _) in resolved.items():
+            self.results[index] = {
+                "status": code, "data": TitleSerializer(title).data,
+            }
+        return self.results
+
+    @staticmethod
+    def create(titles):
+        connection = connections[Title.objects.db]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+            return
+        for title in titles:
+            title.save()
+
+    @staticmethod
+    def update(titles):
+        now = timezone.now()
+        for title in titles:
+            title.modified = now
+        Title.objects.bulk_update(
+            titles, (*TITLE_FIELDS, "category", "modified")
+        )
+
+    def set_genres(self, resolved):
+        replaced = [
+            title.pk for title, genre_ids in resolved
+            if genre_ids is not None
+        ]
+        if self.partial and replaced:
+            GenreTitle.objects.filter(title__in=replaced).delete()
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre_id=genre_id)
+            for title, genre_ids in resolved
+            for genre_id in sorted(genre_ids or ())
+        )
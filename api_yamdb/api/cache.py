@@ -0,0 +1,139 @@
+import hashlib
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse
+
+from api_yamdb.settings import API_CACHE_ALIAS
+from .models import ResourceVersion
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+CACHED_HEADERS = (
+    "Allow", "Vary", "Content-Language", "ETag", "Last-Modified",
+)
+
+_sizes = {}
+_usage = {}
+
+
+class LRUCache(LocMemCache):
+    """Кеш в памяти процесса с ограничением объёма в байтах.
+
+    LocMemCache уже вытесняет давно не читанные ключи и соблюдает TIMEOUT
+    и MAX_ENTRIES; здесь добавлен OPTIONS["MAX_SIZE"].
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", DEFAULT_MAX_SIZE))
+        self._sizes = _sizes.setdefault(name, {})
+        self._usage = _usage.setdefault(name, [0])
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._delete(key)
+        super()._set(key, value, timeout)
+        self._sizes[key] = len(value)
+        self._usage[0] += len(value)
+        while self._usage[0] > self._max_size and self._cache:
+            self._delete(next(reversed(self._cache)))
+
+    def _cull(self):
+        # Вызывается из set() под self._lock, поэтому не через clear().
+        if self._cull_frequency == 0:
+            self._clear()
+            return
+        for _ in range(len(self._cache) // self._cull_frequency):
+            self._delete(next(reversed(self._cache)))
+
+    def _clear(self):
+        self._cache.clear()
+        self._expire_info.clear()
+        self._sizes.clear()
+        self._usage[0] = 0
+
+    def _delete(self, key):
+        self._usage[0] -= self._sizes.pop(key, 0)
+        return super()._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+
+def get_response_cache():
+    return caches[API_CACHE_ALIAS]
+
+
+class PendingBump:
+    """Версии, которые нужно поднять после коммита текущей транзакции."""
+
+    def __init__(self):
+        self.resources = set()
+
+    def __call__(self):
+        ResourceVersion.objects.bump(sorted(self.resources))
+
+
+def bump_versions(*resources):
+    """Сделать недействительными закешированные ответы по ресурсам.
+
+    Внутри транзакции версии поднимаются один раз после коммита, чтобы
+    каскадное удаление сотен строк не обновляло версию на каждой.
+    """
+    if not resources:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]
+    if not connection.in_atomic_block:
+        ResourceVersion.objects.bump(resources)
+        return
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, PendingBump):
+            break
+    else:
+        callback = PendingBump()
+        transaction.on_commit(callback)
+    callback.resources.update(resources)
+
+
+def response_cache_key(request, versions):
+    raw = "|".join([
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        *(f"{name}={version}" for name, version in versions.items()),
+    ])
+    return "response:" + hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def data_cache_key(prefix, params, versions):
+    """Ключ для данных, которые зависят от параметров и версий ресурсов."""
+    raw = "|".join([
+        *(f"{name}={value}" for name, value in params),
+        *(f"{name}={version}" for name, version in versions.items()),
+    ])
+    return f"{prefix}:" + hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def freeze_response(response):
+    return {
+        "status": response.status_code,
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "headers": {
+            name: response[name]
+            for name in CACHED_HEADERS if response.has_header(name)
+        },
+    }
+
+
+def thaw_response(frozen):
+    response = HttpResponse(
+        frozen["content"],
+        status=frozen["status"],
+        content_type=frozen["content_type"],
+    )
+    for name, value in frozen["headers"].items():
+        response[name] = value
+    return response
@@ -1,6 +1,20 @@
-from django_filters.rest_framework import CharFilter, FilterSet
+from django_filters.rest_framework import (
+    CharFilter,
+    ChoiceFilter,
+    FilterSet,
+    NumberFilter
+)
 
-from reviews.models import Title
+from reviews.models import GenreTitle, Title
+
+from .search import search
+
+
+def titles_with_genres(slugs):
+    """id произведений, у которых есть хотя бы один из жанров."""
+    return GenreTitle.objects.filter(
+        genre__slug__in=slugs
+    ).values("title_id")
 
 
 class FilterTitle(FilterSet):
@@ -9,15 +23,67 @@ class FilterTitle(FilterSet):
     )
     genre = CharFilter(
         field_name="genre__slug",
+        method="filter_genre",
+    )
+    genre_mode = ChoiceFilter(
+        choices=(("any", "Любой из жанров"), ("all", "Все жанры")),
+        method="filter_genre_mode",
     )
     name = CharFilter(
         field_name="name",
-        lookup_expr="icontains",
+        method="filter_name",
+    )
+    rating = NumberFilter(
+        field_name="rating",
+        method="filter_rating",
+    )
+    rating_min = NumberFilter(
+        field_name="rating",
+        lookup_expr="gte",
+    )
+    rating_max = NumberFilter(
+        field_name="rating",
+        lookup_expr="lte",
     )
-    rating = CharFilter(
-        field_name="rating__slug",
+    year_min = NumberFilter(
+        field_name="year",
+        lookup_expr="gte",
+    )
+    year_max = NumberFilter(
+        field_name="year",
+        lookup_expr="lte",
     )
 
     class Meta:
         model = Title
         fields = ("__all__")
+
+    def filter_name(self, queryset, name, value):
+        return search(queryset, (name,), (value,))
+
+    def filter_rating(self, queryset, name, value):
+        """Рейтинг в API целый: rating=8 — это средняя оценка от 8 до 9."""
+        return queryset.filter(**{
+            f"{name}__gte": int(value),
+            f"{name}__lt": int(value) + 1,
+        })
+
+    def filter_genre(self, queryset, name, value):
+        """genre=drama,comedy: с любым (genre_mode=any) или всеми жанрами.
+
+        Каждое условие — полусоединение pk IN (SELECT title_id ...) по
+        индексу (genre_id, title_id): строки произведений не размножаются,
+        поэтому DISTINCT не нужен.
+        """
+        slugs = sorted({slug.strip() for slug in value.split(",")} - {""})
+        if not slugs:
+            return queryset
+        if self.form.cleaned_data.get("genre_mode") != "all":
+            return queryset.filter(pk__in=titles_with_genres(slugs))
+        for slug in slugs:
+            queryset = queryset.filter(pk__in=titles_with_genres((slug,)))
+        return queryset
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Режим только уточняет фильтр genre."""
+        return queryset
@@ -0,0 +1,86 @@
+import json
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.outbox import OutboxWorker, outbox_metrics
+from api_yamdb.settings import OUTBOX_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Отправляет письма из очереди пулом воркеров: пачками через одно "
+        "соединение, с повторами и мёртвой очередью."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Сколько воркеров (потоков) отправляют письма.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Пауза в секундах, когда очередь пуста.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help="Сколько писем отправлять через одно соединение.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Отправить всё, что пора, и выйти.",
+        )
+        parser.add_argument(
+            "--metrics",
+            action="store_true",
+            help="Только вывести глубину очереди и задержку доставки.",
+        )
+
+    def handle(self, *args, **options):
+        if options["metrics"]:
+            self.stdout.write(json.dumps(outbox_metrics()))
+            return
+        stop = threading.Event()
+        workers = [
+            OutboxWorker(
+                stop,
+                options["interval"],
+                once=options["once"],
+                batch_size=options["batch_size"],
+            )
+            for _ in range(max(options["workers"], 1))
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(1)
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        sent = sum(worker.sent for worker in workers)
+        failed = sum(worker.failed for worker in workers)
+        errors = sum(worker.errors for worker in workers)
+        broken = [worker.error for worker in workers if worker.error]
+        summary = (
+            f"Отправлено писем: {sent}, не отправлено: {failed}, "
+            f"ошибок воркеров: {errors}."
+        )
+        if broken:
+            raise CommandError(
+                f"{summary} Воркеров остановлено ошибкой: {len(broken)}, "
+                f"последняя: {broken[-1]!r}"
+            )
+        if errors:
+            self.stderr.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
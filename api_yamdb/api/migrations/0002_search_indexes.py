@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Триграммные индексы для icontains: Django сравнивает UPPER(field::text).
+# В SQLite вместо них таблицы FTS5, их создаёт post_migrate (api.apps).
+INDEXES = (
+    ('reviews_title', 'name'),
+    ('reviews_genre', 'name'),
+    ('reviews_category', 'name'),
+    ('users_users', 'username'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" '
+            f'ON "{table}" USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        ('reviews', '0008_title_modified'),
+        ('users', '0002_auto_20221215_1916'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
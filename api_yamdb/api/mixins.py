@@ -1,16 +1,419 @@
-from rest_framework import mixins, viewsets
-from rest_framework.filters import SearchFilter
+import calendar
+import hashlib
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import mixins, permissions, viewsets
+from rest_framework.relations import (
+    HyperlinkedRelatedField,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    SlugRelatedField
+)
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from .cache import (
+    freeze_response,
+    get_response_cache,
+    response_cache_key,
+    thaw_response
+)
+from .models import ResourceVersion
 from .permissions import IsAdminOrReadOnly
+from .search import IndexedSearchFilter
+
+
+class EagerLoadingPlan:
+    """select_related/prefetch_related/only(), нужные сериализатору.
+
+    complete=False означает, что сериализатор читает что-то помимо полей
+    модели (source="*", свойства, методы), и ограничивать only() нельзя.
+    """
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = []
+        self.only = set()
+        self.complete = True
+
+    def merge(self, other, prefix):
+        self.select_related.update(
+            prefix + name for name in other.select_related
+        )
+        self.prefetch_related.extend(
+            Prefetch(
+                prefix + lookup.prefetch_through, queryset=lookup.queryset
+            )
+            for lookup in other.prefetch_related
+        )
+        if other.complete:
+            self.only.update(prefix + name for name in other.only)
+
+    def apply(self, queryset, restrict_fields=True):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if restrict_fields and self.complete and self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def build_eager_loading_plan(fields, model):
+    """Разобрать поля сериализатора и собрать план загрузки для model."""
+    plan = EagerLoadingPlan()
+    for field in fields.values():
+        if field.write_only:
+            continue
+        if not field.source_attrs:
+            plan.complete = False
+            continue
+        _plan_field(field, field.source_attrs, model, "", plan)
+    return plan
+
+
+def _plan_relation(field, model):
+    """План загрузки связанной модели для реляционного или вложенного поля."""
+    if isinstance(field, ListSerializer):
+        field = field.child
+    if isinstance(field, ManyRelatedField):
+        field = field.child_relation
+    if isinstance(field, BaseSerializer):
+        return build_eager_loading_plan(field.fields, model)
+    plan = EagerLoadingPlan()
+    if isinstance(field, SlugRelatedField):
+        plan.only.add(field.slug_field)
+    elif isinstance(field, HyperlinkedRelatedField):
+        plan.only.add(field.lookup_field)
+    elif isinstance(field, PrimaryKeyRelatedField):
+        plan.only.add(model._meta.pk.name)
+    else:
+        plan.complete = False
+    return plan
+
+
+def _plan_field(field, attrs, model, prefix, plan):
+    try:
+        model_field = model._meta.get_field(attrs[0])
+    except FieldDoesNotExist:
+        plan.complete = False
+        return
+    if not model_field.is_relation or attrs[0] != model_field.name:
+        # Обычная колонка или *_id внешнего ключа: связь не нужна.
+        plan.only.add(prefix + model_field.name)
+        return
+    path = prefix + attrs[0]
+    related_model = model_field.related_model
+    if model_field.many_to_many or model_field.one_to_many:
+        if len(attrs) > 1:
+            plan.complete = False
+            return
+        related = _plan_relation(field, related_model)
+        if model_field.one_to_many:
+            related.only.add(model_field.field.name)
+        plan.prefetch_related.append(Prefetch(
+            path,
+            queryset=related.apply(related_model._default_manager.all())
+        ))
+        return
+    if model_field.concrete:
+        plan.only.add(path)
+    else:
+        plan.complete = False
+    if len(attrs) > 1:
+        plan.select_related.add(path)
+        _plan_field(field, attrs[1:], related_model, path + "__", plan)
+        return
+    if isinstance(field, PrimaryKeyRelatedField) and model_field.concrete:
+        return
+    plan.select_related.add(path)
+    plan.merge(_plan_relation(field, related_model), path + "__")
+
+
+class EagerLoadingMixin:
+    """Подгружает для сериализатора связанные объекты заранее.
+
+    По полям сериализатора строится select_related для внешних ключей,
+    prefetch_related для многозначных связей и вложенных списков, а для
+    безопасных запросов ещё и only(). Число запросов на список не зависит
+    от размера страницы.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        plan = build_eager_loading_plan(
+            self.get_serializer().fields, queryset.model
+        )
+        restrict_fields = self.request.method in permissions.SAFE_METHODS
+        if restrict_fields:
+            plan.only.update(self.get_required_fields(queryset))
+        return plan.apply(queryset, restrict_fields=restrict_fields)
+
+    def get_required_fields(self, queryset):
+        """Поля, которые нужны помимо сериализатора.
+
+        Это поля сортировки, которые пагинация читает из строк, и внешний
+        ключ на родителя у querysets связанного менеджера
+        (title.reviews.all()): Django читает его у каждой строки.
+        Многозначные связи (genre) пропускаются: своей колонки у строки
+        нет, а join размножил бы строки.
+        """
+        fields = {field.name for field in queryset._known_related_objects}
+        names = [
+            name for name in queryset.query.order_by if isinstance(name, str)
+        ]
+        names.extend(getattr(self, "keyset_ordering", ()))
+        names.extend(queryset.model._meta.ordering)
+        for name in names:
+            name = name.lstrip("-")
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                fields.add(name)
+        return fields
+
+
+class ValuesListMixin:
+    """Быстрый список по values() вместо моделей и полей DRF.
+
+    Включается атрибутом values_serializer_class вьюсета (см.
+    api.serializers.ValuesSerializer); без него работает обычный list().
+    Рассчитан на вьюсеты с EagerLoadingMixin: поля сортировки для
+    пагинации берутся из get_required_fields().
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        queryset = queryset.values(*self.get_values_lookups(queryset))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.values_serializer_class(page).data
+            )
+        return Response(self.values_serializer_class(queryset).data)
+
+    def get_values_lookups(self, queryset):
+        opts = queryset.model._meta
+        lookups = set(self.values_serializer_class.get_lookups())
+        lookups.update(queryset.query.annotations)
+        lookups.update(
+            opts.get_field(name).attname
+            for name in self.get_required_fields(queryset)
+        )
+        return sorted(lookups)
+
+
+class ResourceVersionsMixin:
+    """Версии ресурсов вьюсета, прочитанные не больше раза за запрос."""
+
+    cache_resources = ()
+
+    def get_cache_resources(self):
+        return self.cache_resources
+
+    def get_resource_versions(self, names):
+        known = self.__dict__.setdefault("_resource_versions", {})
+        missing = [name for name in names if name not in known]
+        if missing:
+            known.update(zip(
+                missing, ResourceVersion.objects.get_versions(missing)
+            ))
+        return {name: known[name] for name in names}
+
+
+class NestedParentMixin:
+    """Родитель вложенного маршрута: произведение для отзывов, отзыв для
+    комментариев.
+
+    parent_lookups сопоставляет поля parent_model с аргументами URL, так
+    что одним запросом проверяется вся цепочка (отзыв принадлежит
+    произведению из URL). Родитель загружается не больше раза за запрос.
+    """
+
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+    parent_related = ()
+
+    def get_parent_filters(self):
+        return {
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookups.items()
+        }
+
+    def get_parent(self):
+        if "_parent" not in self.__dict__:
+            self._parent = self.fetch_parent(self.get_parent_filters())
+        return self._parent
+
+    def fetch_parent(self, filters):
+        return get_object_or_404(
+            self.parent_model.objects.select_related(*self.parent_related),
+            **filters
+        )
+
+    def get_queryset(self):
+        """Список — через родителя (404, если его нет), а отдельный объект
+        ищется сразу с условием на цепочку родителей, без их загрузки."""
+        model = self.get_serializer_class().Meta.model
+        if self.detail:
+            return model.objects.filter(**{
+                f"{self.parent_field}__{name}": value
+                for name, value in self.get_parent_filters().items()
+            })
+        field = model._meta.get_field(self.parent_field)
+        return getattr(
+            self.get_parent(), field.remote_field.get_accessor_name()
+        ).all()
+
+
+class CachedResponseMixin(ResourceVersionsMixin):
+    """Кеширует ответы на анонимные GET-запросы.
+
+    Ключ кеша включает версии ресурсов из get_cache_resources(), а версии
+    растут при каждой записи в их таблицы (см. api.signals), поэтому
+    после изменения данных старый ответ больше не отдаётся.
+    """
+
+    def is_response_cacheable(self, request):
+        return (
+            request.method == "GET"
+            and "HTTP_AUTHORIZATION" not in request.META
+            and bool(self.get_cache_resources())
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_response_cache()
+        key = response_cache_key(
+            request, self.get_resource_versions(self.get_cache_resources())
+        )
+        frozen = cache.get(key)
+        if frozen is not None:
+            response = thaw_response(frozen)
+            response = get_conditional_response(
+                request,
+                etag=response.get("ETag"),
+                last_modified=parse_http_date_safe(
+                    response.get("Last-Modified", "")
+                ),
+                response=response,
+            )
+            response["X-Cache"] = "HIT"
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        media_type = getattr(response, "accepted_media_type", None) or ""
+        if (
+            response.status_code == 200
+            and media_type.startswith("application/json")
+        ):
+            response.render()
+            cache.set(key, freeze_response(response))
+            response["X-Cache"] = "MISS"
+        return response
+
+
+class PreconditionResponse(Exception):
+    """Готовый ответ 304 или 412, прерывающий обработку запроса."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalRequestMixin(ResourceVersionsMixin):
+    """ETag и Last-Modified для чтения, If-Match для изменения и удаления.
+
+    Валидаторы считаются до сериализации по версиям ресурсов, по дате
+    изменения произведения или по полям самого объекта. При совпавшем
+    If-None-Match/If-Modified-Since сразу отдаётся 304, при несовпавшем
+    If-Match на PUT/PATCH/DELETE — 412.
+    """
+
+    conditional_actions = (
+        "list", "retrieve", "update", "partial_update", "destroy",
+    )
+    precondition_headers = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+    def get_conditional_validators(self):
+        """Части ETag и дата последнего изменения, либо (None, None)."""
+        resources = self.get_cache_resources()
+        if not resources:
+            return None, None
+        return list(self.get_resource_versions(resources).values()), None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action not in self.conditional_actions:
+            return
+        safe = request.method in permissions.SAFE_METHODS
+        if not safe and not any(
+            name in request.META for name in self.precondition_headers
+        ):
+            return
+        parts, modified = self.get_conditional_validators()
+        etag = last_modified = None
+        if parts is not None:
+            path = request.path if self.detail else request.get_full_path()
+            raw = "|".join(
+                str(part)
+                for part in (path, request.accepted_media_type, *parts)
+            )
+            etag = quote_etag(hashlib.md5(raw.encode("utf-8")).hexdigest())
+        if modified is not None:
+            last_modified = calendar.timegm(modified.utctimetuple())
+        self.conditional_headers = {}
+        if safe and etag:
+            self.conditional_headers["ETag"] = etag
+        if safe and last_modified:
+            self.conditional_headers["Last-Modified"] = http_date(
+                last_modified
+            )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            raise PreconditionResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PreconditionResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if response.status_code in (200, 304):
+            headers = getattr(self, "conditional_headers", {})
+            for name, value in headers.items():
+                response[name] = value
+        return response
 
 
 class ListCreateDestroyViewSet(
+    CachedResponseMixin,
+    ConditionalRequestMixin,
+    EagerLoadingMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (SearchFilter,)
+    filter_backends = (IndexedSearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
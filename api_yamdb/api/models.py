@@ -0,0 +1,187 @@
+import datetime
+import time
+
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api_yamdb.settings import MAX_EMAIL_LENGTH, OUTBOX_LEASE
+
+
+class ResourceVersionQuerySet(models.QuerySet):
+
+    @staticmethod
+    def new_version():
+        """Начальная версия, не совпадающая с версиями прошлых баз."""
+        return time.time_ns()
+
+    def get_versions(self, names):
+        versions = dict(self.filter(name__in=names).values_list(
+            "name", "version"
+        ))
+        missing = set(names) - set(versions)
+        if missing:
+            self.bulk_create(
+                (
+                    self.model(name=name, version=self.new_version())
+                    for name in missing
+                ),
+                ignore_conflicts=True
+            )
+            versions = dict(self.filter(name__in=names).values_list(
+                "name", "version"
+            ))
+        return [versions[name] for name in names]
+
+    def bump(self, names):
+        updated = self.filter(name__in=names).update(version=F("version") + 1)
+        if updated < len(set(names)):
+            self.get_versions(names)
+
+
+class ResourceVersion(models.Model):
+    """Версия ресурса API: растёт при каждой записи в его таблицы.
+
+    Входит в ключи кеша ответов, поэтому после записи старые ответы
+    больше не находятся. Хранится в БД, чтобы все воркеры видели одну
+    и ту же версию.
+    """
+
+    name = models.CharField(
+        max_length=50,
+        primary_key=True
+    )
+    version = models.BigIntegerField()
+
+    objects = ResourceVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Версия ресурса"
+        verbose_name_plural = "Версии ресурсов"
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+
+    def enqueue(self, to, body, subject=""):
+        """Записать письмо в очередь; отправит его send_outbox."""
+        return self.create(
+            to=to, body=body, subject=subject, next_attempt_at=timezone.now()
+        )
+
+    def due(self, now=None):
+        return self.filter(
+            status=OutboxEmail.PENDING,
+            next_attempt_at__lte=now or timezone.now()
+        )
+
+    def claim(self, batch_size, now=None):
+        """Забрать пачку писем, которым пора уходить.
+
+        next_attempt_at сдвигается на OUTBOX_LEASE: пока воркер шлёт
+        пачку, другие её не видят, а если он упал — письма вернутся в
+        очередь по истечении срока.
+        """
+        now = now or timezone.now()
+        with transaction.atomic(using=self.db):
+            due = self.due(now).order_by("next_attempt_at", "pk")
+            features = connections[self.db].features
+            if features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            emails = list(due[:batch_size])
+            if emails:
+                lease = now + datetime.timedelta(seconds=OUTBOX_LEASE)
+                self.filter(pk__in=[email.pk for email in emails]).update(
+                    next_attempt_at=lease
+                )
+                for email in emails:
+                    email.next_attempt_at = lease
+        return emails
+
+    def renew(self, emails, now=None):
+        """Продлить аренду писем и вернуть те, что всё ещё за воркером.
+
+        Аренда продлевается, только если next_attempt_at не изменился с
+        прошлого claim или renew: письма, которые после истечения срока
+        забрал другой воркер, отсюда больше не отправляются.
+        """
+        now = now or timezone.now()
+        lease = now + datetime.timedelta(seconds=OUTBOX_LEASE)
+        held = []
+        for email in emails:
+            if self.filter(
+                pk=email.pk,
+                status=OutboxEmail.PENDING,
+                next_attempt_at=email.next_attempt_at
+            ).update(next_attempt_at=lease):
+                email.next_attempt_at = lease
+                held.append(email)
+        return held
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (SENT, "Отправлено"),
+        (DEAD, "Не удалось отправить"),
+    )
+
+    to = models.EmailField(
+        "Получатель",
+        max_length=MAX_EMAIL_LENGTH
+    )
+    subject = models.CharField(
+        "Тема",
+        max_length=255,
+        blank=True
+    )
+    body = models.TextField(
+        "Текст"
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        "Попытки",
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        "Следующая попытка"
+    )
+    last_error = models.TextField(
+        "Последняя ошибка",
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        "Дата создания",
+        auto_now_add=True
+    )
+    sent_at = models.DateTimeField(
+        "Дата отправки",
+        null=True,
+        blank=True
+    )
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="outbox_status_next_idx"
+            ),
+            models.Index(
+                fields=["status", "sent_at"],
+                name="outbox_status_sent_idx"
+            ),
+        ]
+        verbose_name = "Письмо"
+        verbose_name_plural = "Очередь писем"
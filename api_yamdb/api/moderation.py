@@ -0,0 +1,70 @@
+from django.db import transaction
+
+from api_yamdb.settings import MODERATION_BATCH_SIZE
+from reviews.models import Comment, Review
+from reviews.signals import deferred_aggregates
+
+# Ресурс модерации и путь от его модели до произведения.
+MODERATION_MODELS = {
+    "reviews": (Review, "title_id"),
+    "comments": (Comment, "review__title_id"),
+}
+RESOURCE_NAMES = {
+    model._meta.label: resource
+    for resource, (model, _) in MODERATION_MODELS.items()
+}
+
+
+def moderation_queryset(resource, criteria):
+    """Отзывы или комментарии, подходящие под id и фильтры запроса."""
+    model, title_lookup = MODERATION_MODELS[resource]
+    filters = {}
+    if "ids" in criteria:
+        filters["pk__in"] = criteria["ids"]
+    if "author" in criteria:
+        filters["author__username"] = criteria["author"]
+    if "title" in criteria:
+        filters[title_lookup] = criteria["title"]
+    if "since" in criteria:
+        filters["pub_date__gte"] = criteria["since"]
+    if "until" in criteria:
+        filters["pub_date__lte"] = criteria["until"]
+    return model.objects.filter(**filters)
+
+
+def delete_in_batches(queryset, batch_size=MODERATION_BATCH_SIZE):
+    """Удалить строки пачками по batch_size, каждую в своей транзакции.
+
+    Блокировки держатся не дольше одной пачки, а рейтинги, распределения
+    оценок и счётчики комментариев пересчитываются по разу на пачку для
+    затронутых произведений и отзывов.
+    """
+    summary = {"deleted": {}, "batches": 0, "titles": set()}
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by("pk").values_list(
+                "pk", flat=True
+            )[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1]
+        with transaction.atomic():
+            with deferred_aggregates() as pending:
+                _, deleted = queryset.model.objects.filter(
+                    pk__in=batch
+                ).delete()
+            summary["titles"] |= pending.titles
+            if pending.surviving_reviews:
+                summary["titles"] |= set(Review.objects.filter(
+                    pk__in=pending.surviving_reviews
+                ).values_list("title_id", flat=True))
+        summary["batches"] += 1
+        for label, count in deleted.items():
+            name = RESOURCE_NAMES.get(label, label)
+            summary["deleted"][name] = summary["deleted"].get(name, 0) + count
+        if len(batch) < batch_size:
+            break
+    summary["titles"] = len(summary["titles"])
+    return summary
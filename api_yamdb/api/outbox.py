@@ -0,0 +1,211 @@
+"""Отправка писем из очереди OutboxEmail.
+
+Запрос только записывает письмо (OutboxEmail.objects.enqueue) и сразу
+отвечает. Воркеры send_outbox забирают письма пачками по
+OUTBOX_BATCH_SIZE и шлют каждую пачку через одно соединение с почтовым
+сервером. Неудачная попытка откладывает письмо с удвоением паузы, после
+OUTBOX_MAX_ATTEMPTS попыток оно остаётся в "мёртвой" очереди.
+"""
+import datetime
+import logging
+import threading
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from api_yamdb.settings import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_DELAY,
+    OUTBOX_SENT_RETENTION
+)
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+LEASE_MARGIN = datetime.timedelta(seconds=OUTBOX_LEASE / 2)
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой после attempts неудачных."""
+    return datetime.timedelta(
+        seconds=OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def _error(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def deliver(emails):
+    """Отправить письма через одно соединение; возвращает (id
+    отправленных, неотправленные письма с last_error).
+
+    Когда от аренды пачки остаётся меньше половины, она продлевается;
+    письма, которые за это время забрал другой воркер, пропускаются,
+    чтобы медленная пачка не отправила их второй раз.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            email.last_error = _error(error)
+        return [], list(emails)
+    sent, failed = [], []
+    queue = list(emails)
+    try:
+        while queue:
+            if queue[0].next_attempt_at - timezone.now() < LEASE_MARGIN:
+                queue = OutboxEmail.objects.renew(queue)
+                continue
+            email = queue.pop(0)
+            try:
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    to=[email.to],
+                    connection=connection,
+                ).send()
+            except Exception as error:
+                email.last_error = _error(error)
+                failed.append(email)
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """Отправить одну пачку; возвращает (отправлено, не отправлено)."""
+    emails = OutboxEmail.objects.claim(batch_size)
+    if not emails:
+        return 0, 0
+    sent, failed = deliver(emails)
+    now = timezone.now()
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.SENT, sent_at=now, last_error=""
+        )
+    for email in failed:
+        email.attempts += 1
+        email.next_attempt_at = now + retry_delay(email.attempts)
+        if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboxEmail.DEAD
+            logger.error(
+                "Письмо %s не отправлено за %s попыток: %s",
+                email.pk, email.attempts, email.last_error
+            )
+    OutboxEmail.objects.bulk_update(
+        failed, ["attempts", "status", "next_attempt_at", "last_error"]
+    )
+    return len(sent), len(failed)
+
+
+def purge_sent():
+    """Удалить отправленные письма старше OUTBOX_SENT_RETENTION."""
+    return OutboxEmail.objects.filter(
+        status=OutboxEmail.SENT,
+        sent_at__lt=timezone.now() - datetime.timedelta(
+            seconds=OUTBOX_SENT_RETENTION
+        ),
+    ).delete()[0]
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def outbox_metrics(sample_size=1000):
+    """Глубина очереди и задержка доставки (от записи до отправки, в
+    секундах) по последним sample_size отправленным письмам."""
+    now = timezone.now()
+    pending = OutboxEmail.objects.filter(status=OutboxEmail.PENDING)
+    oldest = pending.order_by("created_at").values_list(
+        "created_at", flat=True
+    ).first()
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutboxEmail.objects.filter(
+            status=OutboxEmail.SENT
+        ).order_by("-sent_at").values_list(
+            "created_at", "sent_at"
+        )[:sample_size]
+    )
+    return {
+        "pending": pending.count(),
+        "due": OutboxEmail.objects.due(now).count(),
+        "dead": OutboxEmail.objects.filter(status=OutboxEmail.DEAD).count(),
+        "oldest_pending_age": (
+            None if oldest is None else (now - oldest).total_seconds()
+        ),
+        "send_latency": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+class OutboxWorker(threading.Thread):
+    """Воркер пула: шлёт пачки, пока они есть, затем ждёт interval секунд.
+
+    С once=True выходит, как только очередь опустела. Ошибка пачки
+    (например, заблокированная таблица) не останавливает воркер: она
+    пишется в лог, а следующая попытка откладывается с удвоением паузы.
+    В режиме once после OUTBOX_MAX_ATTEMPTS ошибок подряд воркер сдаётся
+    и оставляет последнюю ошибку в error.
+    """
+
+    def __init__(self, stop, interval, once=False,
+                 batch_size=OUTBOX_BATCH_SIZE):
+        super().__init__(daemon=True)
+        self.stop = stop
+        self.interval = interval
+        self.once = once
+        self.batch_size = batch_size
+        self.sent = self.failed = self.errors = 0
+        self.error = None
+
+    def backoff(self, errors):
+        return min(self.interval * 2 ** (errors - 1), OUTBOX_RETRY_DELAY)
+
+    def step(self):
+        sent, failed = send_batch(self.batch_size)
+        if not (sent or failed or self.once):
+            purge_sent()
+        return sent, failed
+
+    def run(self):
+        errors = 0
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    sent, failed = self.step()
+                except Exception as error:
+                    logger.exception("Воркер очереди писем: ошибка пачки")
+                    errors += 1
+                    self.errors += 1
+                    if self.once and errors >= OUTBOX_MAX_ATTEMPTS:
+                        self.error = error
+                        return
+                    connections.close_all()
+                    self.stop.wait(self.backoff(errors))
+                    continue
+                errors = 0
+                self.sent += sent
+                self.failed += failed
+                if sent or failed:
+                    continue
+                if self.once:
+                    return
+                self.stop.wait(self.interval)
+        finally:
+            connections.close_all()
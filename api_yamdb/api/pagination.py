@@ -0,0 +1,346 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Min, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import OrderBy
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Значение {value!r} нельзя положить в курсор")
+
+
+class KeysetTerm:
+    """Одно поле сортировки keyset-пагинации."""
+
+    def __init__(self, name, descending, nulls_largest, field=None):
+        self.name = name
+        self.descending = descending
+        self.nulls_largest = nulls_largest
+        self.field = field
+
+    @property
+    def nulls_last(self):
+        return self.nulls_largest != self.descending
+
+    def reversed(self):
+        return KeysetTerm(
+            self.name, not self.descending, self.nulls_largest, self.field
+        )
+
+    def to_python(self, value):
+        """Значение из курсора в типе поля; ValidationError, если не
+        подходит."""
+        if value is None or self.field is None:
+            return value
+        return self.field.to_python(value)
+
+    def expression(self):
+        field = F(self.name)
+        return field.desc() if self.descending else field.asc()
+
+    def after(self, value):
+        """Условие "строго после value" в порядке сортировки этого поля."""
+        if value is None:
+            if self.nulls_last:
+                return None
+            return Q(**{f"{self.name}__isnull": False})
+        lookup = "lt" if self.descending else "gt"
+        condition = Q(**{f"{self.name}__{lookup}": value})
+        if self.nulls_last:
+            condition |= Q(**{f"{self.name}__isnull": True})
+        return condition
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f"{self.name}__isnull": True})
+        return Q(**{self.name: value})
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу вместо OFFSET.
+
+    Следующая страница выбирается условием "строго после последней строки"
+    по полям сортировки с первичным ключом в конце, поэтому номер страницы
+    не влияет на стоимость запроса, а COUNT(*) не выполняется.
+    Сортировка берётся из запроса (в том числе от OrderingFilter),
+    затем из keyset_ordering вьюсета, затем из Meta.ordering модели.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = None
+    default_ordering = ("pk",)
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_limit(request)
+        queryset, self.ordering = self.get_ordering(queryset, view)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+        ordering = self.ordering
+        if reverse:
+            ordering = [term.reversed() for term in ordering]
+        if cursor is not None:
+            queryset = queryset.filter(self.seek(ordering, cursor["values"]))
+        queryset = queryset.order_by(
+            *(term.expression() for term in ordering)
+        )
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.cursor = cursor
+        self.page = rows
+        return rows
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param],
+                strict=True,
+                cutoff=self.max_limit
+            )
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_ordering(self, queryset, view):
+        query = queryset.query
+        ordering = list(query.order_by)
+        if not ordering:
+            ordering = list(getattr(view, "keyset_ordering", ()))
+        if not ordering and query.default_ordering:
+            ordering = list(query.get_meta().ordering)
+        if not ordering:
+            ordering = list(self.default_ordering)
+
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+        pk_name = queryset.model._meta.pk.attname
+        terms = []
+        for index, item in enumerate(ordering):
+            if isinstance(item, OrderBy) and isinstance(item.expression, F):
+                name, descending = item.expression.name, item.descending
+            elif isinstance(item, str) and item != "?":
+                name, descending = item.lstrip("-"), item.startswith("-")
+            else:
+                continue
+            queryset, name = self.resolve_name(queryset, name, index)
+            if name == "pk":
+                name = pk_name
+            if name not in (term.name for term in terms):
+                terms.append(KeysetTerm(
+                    name, descending, nulls_largest,
+                    self.get_field(queryset, name)
+                ))
+            if name == pk_name:
+                break
+        else:
+            terms.append(KeysetTerm(
+                pk_name, False, nulls_largest,
+                self.get_field(queryset, pk_name)
+            ))
+        return queryset, terms
+
+    @staticmethod
+    def get_field(queryset, name):
+        """Поле модели или аннотации, по которому приводятся значения
+        курсора."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def resolve_name(queryset, name, index):
+        """Свести поле сортировки к колонке, значение которой есть в строке.
+
+        Внешний ключ заменяется на его *_id, путь через связи и
+        многозначные связи (genre) — на аннотацию, чтобы у каждой строки
+        было ровно одно значение ключа.
+        """
+        if name == "pk" or name in queryset.query.annotations:
+            return queryset, name
+        opts = queryset.model._meta
+        multivalued = False
+        parts = name.split(LOOKUP_SEP)
+        for part in parts:
+            field = opts.get_field(part)
+            if field.is_relation:
+                multivalued = (
+                    multivalued or field.many_to_many or field.one_to_many
+                )
+                opts = field.related_model._meta
+        if len(parts) == 1 and not multivalued:
+            return queryset, field.attname if field.concrete else name
+        alias = f"keyset_{index}"
+        value = Min(name) if multivalued else F(name)
+        return queryset.annotate(**{alias: value}), alias
+
+    @staticmethod
+    def seek(ordering, values):
+        condition = None
+        equal = Q()
+        for term, value in zip(ordering, values):
+            after = term.after(value)
+            if after is not None:
+                after = equal & after
+                condition = after if condition is None else condition | after
+            equal &= term.equal(value)
+        return condition if condition is not None else Q(pk__in=[])
+
+    @staticmethod
+    def row_values(row, ordering):
+        if isinstance(row, dict):
+            return [row[term.name] for term in ordering]
+        return [getattr(row, term.name) for term in ordering]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(
+                encoded.encode("ascii")
+            ).decode("utf-8"))
+            values, reverse = payload["v"], bool(payload.get("r"))
+        except (
+            TypeError, ValueError, KeyError, UnicodeError, binascii.Error
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                term.to_python(value)
+                for term, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {"values": values, "reverse": reverse}
+
+    def encode_cursor(self, values, reverse):
+        payload = {"v": values}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, default=_encode_value).encode("utf-8")
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            self.row_values(self.page[-1], self.ordering), reverse=False
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            values = self.row_values(self.page[0], self.ordering)
+        else:
+            values = self.cursor["values"]
+        return self.encode_cursor(values, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+
+class OptInKeysetPagination(LimitOffsetPagination):
+    """LimitOffsetPagination с keyset-режимом по запросу клиента.
+
+    Keyset включается параметром ?pagination=cursor или переданным
+    ?cursor=...; остальные клиенты получают прежний ответ
+    с count/next/previous/results.
+    """
+
+    mode_query_param = "pagination"
+    keyset_mode = "cursor"
+    keyset_class = KeysetPagination
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.keyset_mode
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class PositionPagination(LimitOffsetPagination):
+    """limit/offset по сплошной нумерации строк в position_field.
+
+    Страница выбирается условием offset < position <= offset + limit по
+    индексу, а не OFFSET, поэтому её стоимость не зависит от номера.
+    """
+
+    position_field = "position"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = self.get_count(queryset)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return list(queryset.filter(**{
+            f"{self.position_field}__gt": self.offset,
+            f"{self.position_field}__lte": self.offset + self.limit,
+        }).order_by(self.position_field))
@@ -38,6 +38,25 @@ class IsAdminOnly(permissions.BasePermission):
         return False
 
 
+class IsSelfOrAdmin(permissions.BasePermission):
+    """Свои данные (users/me/...) - любому пользователю,
+    чужие - только админу"""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            view.kwargs.get("username") == "me" or request.user.is_admin
+        )
+
+
+class IsModerOrAdmin(permissions.BasePermission):
+    """Только для модератора или админа"""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_admin or request.user.is_moderator
+        )
+
+
 class IsAuthorOrModerOrAdminOrReadOnly(permissions.BasePermission):
     """Ограничение для Отзывов и Комментарий:"""
     """1. Оставлять новые и оценивать может только"""
@@ -0,0 +1,63 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# JSONRenderer DRF экранирует разделители строк: их не принимает JavaScript.
+LINE_SEPARATORS = (
+    ("\u2028".encode("utf-8"), b"\\u2028"),
+    ("\u2029".encode("utf-8"), b"\\u2029"),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же выводом, что и у DRF.
+
+    Даты, Decimal, ленивые строки и всё, что orjson не знает,
+    сериализуются через JSONEncoder DRF. Без orjson, с отступами
+    (?indent, браузерный API), с ensure_ascii и на данных, которые orjson
+    не берёт (целые больше 64 бит), работает обычный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=(
+                    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                ),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            content = content.replace(raw, escaped)
+        return content
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson; тело не в UTF-8 разбирает парсер DRF."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
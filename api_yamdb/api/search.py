@@ -0,0 +1,158 @@
+from django.apps import apps
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+SEARCH_RANK = "search_rank"
+# Поля, для которых миграции и post_migrate строят поисковые индексы.
+SEARCH_FIELDS = {
+    "reviews.Title": ("name",),
+    "reviews.Genre": ("name",),
+    "reviews.Category": ("name",),
+    "users.Users": ("username",),
+}
+# Короче трёх символов триграммный индекс бесполезен.
+MIN_TRIGRAM_LENGTH = 3
+
+
+def is_indexed(model, field):
+    return field in SEARCH_FIELDS.get(model._meta.label, ())
+
+
+def fts_table(model, field):
+    return f"{model._meta.db_table}_{field}_search"
+
+
+def _fts_phrase(text):
+    return '"{}"'.format(text.replace('"', '""'))
+
+
+def _uses_fts(queryset, field, text):
+    return (
+        connections[queryset.db].vendor == "sqlite"
+        and is_indexed(queryset.model, field)
+        and len(text) >= MIN_TRIGRAM_LENGTH
+    )
+
+
+def search_condition(queryset, field, text):
+    """Условие "field содержит text", которое обслуживает индекс.
+
+    PostgreSQL выполняет icontains по GIN-индексу pg_trgm на UPPER(field),
+    SQLite — через виртуальную таблицу FTS5 с токенизатором trigram.
+    """
+    if not _uses_fts(queryset, field, text):
+        return Q(**{f"{field}__icontains": text})
+    table = fts_table(queryset.model, field)
+    return Q(pk__in=RawSQL(
+        f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s',
+        (_fts_phrase(text),)
+    ))
+
+
+def search_rank(queryset, field, text):
+    """Релевантность совпадения, больше — лучше; None, если не оценить."""
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql" and is_indexed(queryset.model, field):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return TrigramSimilarity(field, text)
+    if not _uses_fts(queryset, field, text):
+        return None
+    table = fts_table(queryset.model, field)
+    opts = queryset.model._meta
+    return RawSQL(
+        f'SELECT -rank FROM "{table}" WHERE "{table}" MATCH %s '
+        f'AND rowid = "{opts.db_table}"."{opts.pk.column}"',
+        (_fts_phrase(text),)
+    )
+
+
+def search(queryset, fields, terms):
+    """Отфильтровать по всем terms в любом из fields и оценить релевантность.
+
+    Если релевантность можно посчитать, строки упорядочены по ней,
+    а явная сортировка (OrderingFilter) может её переопределить.
+    """
+    ranks = []
+    for term in terms:
+        condition = Q()
+        for field in fields:
+            condition |= search_condition(queryset, field, term)
+            rank = search_rank(queryset, field, term)
+            if rank is not None:
+                ranks.append(rank)
+        queryset = queryset.filter(condition)
+    if not ranks:
+        return queryset
+    total = ranks[0]
+    for rank in ranks[1:]:
+        total = total + rank
+    return queryset.annotate(**{SEARCH_RANK: total}).order_by(
+        f"-{SEARCH_RANK}", "pk"
+    )
+
+
+class IndexedSearchFilter(SearchFilter):
+    """SearchFilter, который ищет по индексам из api.search.
+
+    Поддерживаются только поля модели без префиксов ^, =, @ и $;
+    порядок выдачи — по релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        return search(queryset, fields, terms)
+
+
+def create_sqlite_search_tables(using):
+    """Создать таблицы FTS5 и триггеры, которые держат их в актуальном виде.
+
+    SQLite пересоздаёт таблицу при изменении схемы и теряет её триггеры,
+    поэтому они восстанавливаются после каждого migrate, а индекс
+    перестраивается заново.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+        for label, fields in SEARCH_FIELDS.items():
+            model = apps.get_model(label)
+            opts = model._meta
+            if opts.db_table not in existing:
+                continue
+            for field in fields:
+                column = opts.get_field(field).column
+                table = fts_table(model, field)
+                for statement in _sqlite_search_sql(
+                    table, opts.db_table, opts.pk.column, column
+                ):
+                    cursor.execute(statement)
+
+
+def _sqlite_search_sql(table, content, pk, column):
+    delete = (
+        f'INSERT INTO "{table}"("{table}", rowid, "{column}") '
+        f'VALUES (\'delete\', old."{pk}", old."{column}");'
+    )
+    insert = (
+        f'INSERT INTO "{table}"(rowid, "{column}") '
+        f'VALUES (new."{pk}", new."{column}");'
+    )
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5('
+        f'"{column}", content="{content}", content_rowid="{pk}", '
+        f'tokenize="trigram")',
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ai" AFTER INSERT '
+        f'ON "{content}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ad" AFTER DELETE '
+        f'ON "{content}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_au" AFTER UPDATE '
+        f'OF "{column}" ON "{content}" BEGIN {delete} {insert} END',
+        f'INSERT INTO "{table}"("{table}") VALUES (\'rebuild\')',
+    )
@@ -1,12 +1,49 @@
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
 from reviews.validators import validate_username, validate_year
 from users.models import Users
-from api_yamdb.settings import MAX_EMAIL_LENGTH, MAX_USERS_NAME_LENGTH
+from api_yamdb.settings import (
+    EXPOSE_COUNTERS,
+    MAX_EMAIL_LENGTH,
+    MAX_USERS_NAME_LENGTH,
+    MODERATION_MAX_IDS
+)
+
+
+class ValuesSerializer:
+    """Сериализатор только для чтения по строкам values().
+
+    Обходит поля DRF и создание моделей. fields — пары (ключ ответа,
+    путь для values()); вывод должен совпадать с обычным сериализатором
+    байт в байт.
+    """
+
+    fields = ()
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_lookups(cls):
+        return [lookup for _, lookup in cls.fields]
+
+    def prepare(self, rows):
+        """Подгрузить связанные данные сразу для всей страницы."""
+
+    def to_representation(self, row):
+        return {name: row[lookup] for name, lookup in self.fields}
+
+    @property
+    def data(self):
+        rows = list(self.rows)
+        self.prepare(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+_datetime_field = serializers.DateTimeField()
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -42,19 +79,93 @@ class TitleSerializer(serializers.ModelSerializer):
         model = Title
 
 
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """Элемент пакетной загрузки произведений.
+
+    Слаги жанров и категории здесь не ищутся в БД: их разрешает
+    api.bulk одним запросом на весь пакет.
+    """
+
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+    year = serializers.IntegerField(
+        validators=(validate_year,)
+    )
+
+    class Meta:
+        fields = (
+            "id", "name", "year", "description", "genre", "category",
+        )
+        model = Title
+
+
 class TitleGetSerializer(serializers.ModelSerializer):
     genre = GenreSerializer(many=True)
     category = CategorySerializer(required=True)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(
+        source="rating_count", read_only=True
+    )
 
     class Meta:
         fields = (
-            "id", "name", "year", "rating", "description", "genre", "category",
+            "id", "name", "year", "rating",
+            *(("reviews_count",) if EXPOSE_COUNTERS else ()),
+            "description", "genre", "category",
         )
         read_only_fields = fields
         model = Title
 
 
+class TitleValuesSerializer(ValuesSerializer):
+    fields = (
+        ("id", "id"),
+        ("name", "name"),
+        ("year", "year"),
+        ("rating", "rating"),
+        *((("reviews_count", "rating_count"),) if EXPOSE_COUNTERS else ()),
+        ("description", "description"),
+        ("category", "category__slug"),
+        ("category", "category__name"),
+    )
+
+    def prepare(self, rows):
+        self.genres = {}
+        genres = GenreTitle.objects.filter(
+            title_id__in=[row["id"] for row in rows]
+        ).order_by("genre_id").values_list(
+            "title_id", "genre__name", "genre__slug"
+        )
+        for title_id, name, slug in genres:
+            self.genres.setdefault(title_id, []).append(
+                {"name": name, "slug": slug}
+            )
+
+    def to_representation(self, row):
+        category = None
+        if row["category__slug"] is not None:
+            category = {
+                "name": row["category__name"],
+                "slug": row["category__slug"],
+            }
+        rating = row["rating"]
+        data = {
+            "id": row["id"],
+            "name": row["name"],
+            "year": row["year"],
+            "rating": None if rating is None else int(rating),
+        }
+        if EXPOSE_COUNTERS:
+            data["reviews_count"] = row["rating_count"]
+        data.update({
+            "description": row["description"],
+            "genre": self.genres.get(row["id"], []),
+            "category": category,
+        })
+        return data
+
+
 class ReviewSerializer(serializers.ModelSerializer):
 
     author = serializers.SlugRelatedField(
@@ -64,23 +175,11 @@ class ReviewSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = ("id", "text", "author", "score", "pub_date",)
-        model = Review
-
-    def validate(self, data):
-        request = self.context["request"]
-        title = get_object_or_404(
-            Title,
-            pk=self.context["view"].kwargs.get("title_id")
+        fields = (
+            "id", "text", "author", "score", "pub_date",
+            *(("comments_count",) if EXPOSE_COUNTERS else ()),
         )
-        if (
-            Review.objects.filter(title=title, author=request.user).exists()
-            and request.method == "POST"
-        ):
-            raise serializers.ValidationError(
-                "Вы уже оставили озыв на это произведение"
-            )
-        return data
+        model = Review
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -94,6 +193,62 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
+class UserReviewSerializer(ReviewSerializer):
+    """Отзыв в ленте пользователя: с id произведения."""
+
+    title = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = (*ReviewSerializer.Meta.fields, "title")
+
+
+class UserCommentSerializer(CommentSerializer):
+    """Комментарий в ленте пользователя: с id отзыва и произведения."""
+
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
+    title = serializers.IntegerField(source="review.title_id", read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = (*CommentSerializer.Meta.fields, "review", "title")
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    fields = (
+        ("id", "id"),
+        ("text", "text"),
+        ("author", "author__username"),
+        ("score", "score"),
+        ("pub_date", "pub_date"),
+        *((("comments_count", "comments_count"),) if EXPOSE_COUNTERS else ()),
+    )
+
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        data["pub_date"] = _datetime_field.to_representation(row["pub_date"])
+        return data
+
+
+class CommentValuesSerializer(ReviewValuesSerializer):
+    fields = (
+        ("id", "id"),
+        ("text", "text"),
+        ("author", "author__username"),
+        ("pub_date", "pub_date"),
+    )
+
+
+class UserReviewValuesSerializer(ReviewValuesSerializer):
+    fields = (*ReviewValuesSerializer.fields, ("title", "title_id"))
+
+
+class UserCommentValuesSerializer(CommentValuesSerializer):
+    fields = (
+        *CommentValuesSerializer.fields,
+        ("review", "review_id"),
+        ("title", "review__title_id"),
+    )
+
+
 class UsersSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         validators=(
@@ -129,6 +284,39 @@ class SignUpSerializer(serializers.Serializer):
     )
 
 
+class ModerationSerializer(serializers.Serializer):
+    """Какие отзывы или комментарии удалить: id или фильтр."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=MODERATION_MAX_IDS,
+        required=False
+    )
+    author = serializers.CharField(
+        max_length=MAX_USERS_NAME_LENGTH,
+        required=False
+    )
+    title = serializers.IntegerField(min_value=1, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if not set(data) - {"dry_run"}:
+            raise serializers.ValidationError(
+                "Укажите ids или хотя бы один фильтр: author, title, "
+                "since, until."
+            )
+        if (
+            "since" in data and "until" in data
+            and data["since"] > data["until"]
+        ):
+            raise serializers.ValidationError(
+                {"until": ["Дата until раньше since."]}
+            )
+        return data
+
+
 class GetTokenSerializer(serializers.Serializer):
     """Сериализатор для получения токена при регистрации."""
 
@@ -0,0 +1,56 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from import_export.signals import post_import
+
+from reviews.leaderboard import leaderboard_rebuilt
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import ClaimsUser, Users
+from .cache import bump_versions
+
+MODEL_RESOURCES = {
+    Title: ("titles",),
+    GenreTitle: ("titles",),
+    Genre: ("genres",),
+    Category: ("categories",),
+    Review: ("reviews",),
+    Comment: ("comments",),
+    # Отзывы и комментарии показывают только имя автора.
+    Users: ("usernames",),
+    ClaimsUser: ("usernames",),
+}
+
+
+def bump_on_save(sender, instance, created, **kwargs):
+    if issubclass(sender, Users) and (
+        created or not instance.token_state_changed(("username",))
+    ):
+        return
+    bump_versions(*MODEL_RESOURCES[sender])
+
+
+def bump_on_delete(sender, instance, **kwargs):
+    bump_versions(*MODEL_RESOURCES[sender])
+
+
+def bump_on_genre_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_versions(*MODEL_RESOURCES[GenreTitle])
+
+
+def bump_on_import(sender, model, **kwargs):
+    bump_versions(*MODEL_RESOURCES.get(model, ()))
+
+
+def bump_on_leaderboard(sender, **kwargs):
+    bump_versions("leaderboard")
+
+
+for model in MODEL_RESOURCES:
+    post_save.connect(
+        bump_on_save, sender=model, dispatch_uid=f"bump_on_save_{model}"
+    )
+    post_delete.connect(
+        bump_on_delete, sender=model, dispatch_uid=f"bump_on_delete_{model}"
+    )
+m2m_changed.connect(bump_on_genre_change, sender=Title.genre.through)
+post_import.connect(bump_on_import)
+leaderboard_rebuilt.connect(bump_on_leaderboard)
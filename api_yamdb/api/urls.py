@@ -4,10 +4,15 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet,
     CommentViewSet,
+    Export,
     GenreViewSet,
+    Moderation,
+    OutboxMetrics,
     ReviewViewSet,
     SignUp,
     TitleViewSet,
+    UserCommentViewSet,
+    UserReviewViewSet,
     UsersViewSet,
     get_token
 )
@@ -29,10 +34,31 @@ router.register(
     basename="comments"
 )
 router.register("users", UsersViewSet, basename="users")
+router.register(
+    r"users/(?P<username>[^/.]+)/reviews",
+    UserReviewViewSet,
+    basename="user-reviews"
+)
+router.register(
+    r"users/(?P<username>[^/.]+)/comments",
+    UserCommentViewSet,
+    basename="user-comments"
+)
 
 
 urlpatterns = [
     path("v1/", include(router.urls)),
     path("v1/auth/signup/", SignUp.as_view(), name="register"),
     path("v1/auth/token/", get_token, name="token"),
+    path("v1/export/<str:resource>/", Export.as_view(), name="export"),
+    path(
+        "v1/moderation/<str:resource>/",
+        Moderation.as_view(),
+        name="moderation"
+    ),
+    path(
+        "v1/outbox/metrics/",
+        OutboxMetrics.as_view(),
+        name="outbox-metrics"
+    ),
 ]
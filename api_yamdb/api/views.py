@@ -1,34 +1,87 @@
+import datetime
+
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMessage
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, response, status, viewsets
+from rest_framework import mixins, permissions, response, status, viewsets
 from rest_framework.decorators import action, api_view
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
 
-from reviews.models import Category, Genre, Review, Title, Users
-from api_yamdb.settings import MESSAGE_EMAIL_EXISTS, MESSAGE_USERNAME_EXISTS
+from reviews.export import EXPORT_FORMATS, EXPORTS, export_stream
+from users.authentication import access_token_for
+from reviews.models import (
+    MAX_SCORE,
+    MIN_SCORE,
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleActivity,
+    TitleRank,
+    TitleScore,
+    Users,
+    bucket_start
+)
+from api_yamdb.settings import (
+    BULK_MAX_ITEMS,
+    MESSAGE_EMAIL_EXISTS,
+    MESSAGE_REVIEW_EXISTS,
+    MESSAGE_USERNAME_EXISTS,
+    TRENDING_WINDOWS
+)
+from .bulk import BulkTitleWriter
+from .cache import data_cache_key, get_response_cache
+from .facets import title_facets
 from .filters import FilterTitle
-from .mixins import ListCreateDestroyViewSet
+from .moderation import (
+    MODERATION_MODELS,
+    delete_in_batches,
+    moderation_queryset
+)
+from .mixins import (
+    CachedResponseMixin,
+    ConditionalRequestMixin,
+    EagerLoadingMixin,
+    ListCreateDestroyViewSet,
+    NestedParentMixin,
+    ValuesListMixin
+)
+from .models import OutboxEmail
+from .outbox import outbox_metrics
+from .pagination import KeysetPagination, PositionPagination
 from .permissions import (
     IsAdminOnly,
     IsAdminOrReadOnly,
-    IsAuthorOrModerOrAdminOrReadOnly
+    IsAuthorOrModerOrAdminOrReadOnly,
+    IsModerOrAdmin,
+    IsSelfOrAdmin
 )
+from .search import IndexedSearchFilter
 from .serializers import (
     CategorySerializer,
     CommentSerializer,
+    CommentValuesSerializer,
     GenreSerializer,
     GetTokenSerializer,
+    ModerationSerializer,
     ReviewSerializer,
+    ReviewValuesSerializer,
     SignUpSerializer,
     TitleGetSerializer,
     TitleSerializer,
+    TitleValuesSerializer,
+    UserCommentSerializer,
+    UserCommentValuesSerializer,
+    UserReviewSerializer,
+    UserReviewValuesSerializer,
     UsersSerializer
 )
 
@@ -36,19 +89,215 @@ from .serializers import (
 class GenreViewSet(ListCreateDestroyViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_resources = ("genres",)
 
 
 class CategoryViewSet(ListCreateDestroyViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_resources = ("categories",)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(rating=Avg("reviews__score"))
+class TitleViewSet(
+    CachedResponseMixin,
+    ConditionalRequestMixin,
+    ValuesListMixin,
+    EagerLoadingMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Title.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend, OrderingFilter)
     filterset_class = FilterTitle
-    ordering_fields = ["rating", "category", "genre"]
+    ordering_fields = ["rating", "year", "category", "genre"]
+    cache_resources = ("titles", "reviews", "genres", "categories")
+    values_serializer_class = TitleValuesSerializer
+
+    def get_conditional_validators(self):
+        if not self.detail:
+            return super().get_conditional_validators()
+        title = Title.objects.filter(pk=self.kwargs["pk"]).values_list(
+            "modified", "rating_sum", "rating_count"
+        ).first()
+        if title is None:
+            return None, None
+        versions = self.get_resource_versions(("genres", "categories"))
+        return [*title, *versions.values()], title[0]
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """Счётчики для боковой панели фильтров каталога."""
+        filterset = FilterTitle(
+            request.query_params, queryset=Title.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        signature = sorted(
+            (name, value)
+            for name in filterset.filters
+            for value in request.query_params.getlist(name)
+        )
+        key = data_cache_key(
+            "facets",
+            signature,
+            self.get_resource_versions(self.get_cache_resources()),
+        )
+        cache = get_response_cache()
+        data = cache.get(key)
+        if data is None:
+            data = title_facets(filterset.qs)
+            cache.set(key, data)
+        return Response(data)
+
+    @action(detail=True, methods=["get"], url_path="score-distribution")
+    def score_distribution(self, request, pk=None):
+        """Сколько отзывов поставили каждую оценку."""
+        try:
+            counts = dict(TitleScore.objects.filter(title_id=pk).values_list(
+                "score", "count"
+            ))
+        except (TypeError, ValueError):
+            raise NotFound()
+        if not counts and not Title.objects.filter(pk=pk).exists():
+            raise NotFound()
+        scores = [
+            {"score": score, "count": counts.get(score, 0)}
+            for score in range(MIN_SCORE, MAX_SCORE + 1)
+        ]
+        return Response({
+            "count": sum(item["count"] for item in scores),
+            "scores": scores,
+        })
+
+    @action(
+        detail=False,
+        methods=["get"],
+        cache_resources=(*cache_resources, "leaderboard"),
+    )
+    def top(self, request):
+        """Лучшие произведения по байесовскому рейтингу: во всём каталоге,
+        в категории (?category=slug) или в жанре (?genre=slug)."""
+        paginator = PositionPagination()
+        ranks = paginator.paginate_queryset(
+            TitleRank.objects.filter(**self.get_top_scope(request)).values(
+                "position", "score", "title_id"
+            ),
+            request,
+            view=self
+        )
+        titles = self.get_titles_data(rank["title_id"] for rank in ranks)
+        return paginator.get_paginated_response([
+            {
+                "position": rank["position"],
+                "score": rank["score"],
+                "title": titles[rank["title_id"]],
+            }
+            for rank in ranks if rank["title_id"] in titles
+        ])
+
+    @action(detail=False, methods=["get"], cache_resources=())
+    def trending(self, request):
+        """Произведения с самой большой активностью (новые отзывы и
+        комментарии) за окно ?window=24h|7d|30d.
+
+        Окно сдвигается раз в час, поэтому страница кешируется до конца
+        часа или до записи в произведения, отзывы, комментарии, жанры или
+        категории.
+        """
+        window = request.query_params.get("window", next(iter(
+            TRENDING_WINDOWS
+        )))
+        if window not in TRENDING_WINDOWS:
+            raise ValidationError({"window": [
+                f"Допустимые значения: {', '.join(TRENDING_WINDOWS)}."
+            ]})
+        now = timezone.now()
+        hour = bucket_start(now, TitleActivity.HOUR)
+        key = data_cache_key(
+            "trending",
+            [("url", request.build_absolute_uri()), ("hour", hour)],
+            self.get_resource_versions(
+                ("titles", "reviews", "comments", "genres", "categories")
+            ),
+        )
+        cache = get_response_cache()
+        data = cache.get(key)
+        if data is None:
+            data = self.get_trending_data(TRENDING_WINDOWS[window], now)
+            expires = hour + datetime.timedelta(hours=1)
+            cache.set(key, data, (expires - now).total_seconds())
+        return Response(data)
+
+    def get_trending_data(self, hours, now):
+        paginator = LimitOffsetPagination()
+        rows = paginator.paginate_queryset(
+            TitleActivity.objects.trending(hours, now),
+            self.request,
+            view=self
+        )
+        titles = self.get_titles_data(row["title_id"] for row in rows)
+        return paginator.get_paginated_response([
+            {
+                "activity": row["activity"],
+                "reviews": row["reviews_total"],
+                "comments": row["comments_total"],
+                "title": titles[row["title_id"]],
+            }
+            for row in rows if row["title_id"] in titles
+        ]).data
+
+    @staticmethod
+    def get_titles_data(ids):
+        """Произведения страницы рейтинга в виде TitleValuesSerializer."""
+        titles = Title.objects.filter(pk__in=list(ids)).values(
+            *TitleValuesSerializer.get_lookups()
+        )
+        return {
+            title["id"]: title
+            for title in TitleValuesSerializer(titles).data
+        }
+
+    def get_top_scope(self, request):
+        category = request.query_params.get("category")
+        genre = request.query_params.get("genre")
+        if category and genre:
+            raise ValidationError({"non_field_errors": [
+                "Укажите либо category, либо genre."
+            ]})
+        if not category and not genre:
+            return {"scope": TitleRank.ALL, "scope_id": 0}
+        model, scope = (
+            (Category, TitleRank.CATEGORY) if category
+            else (Genre, TitleRank.GENRE)
+        )
+        scope_id = model.objects.filter(
+            slug=category or genre
+        ).values_list("pk", flat=True).first()
+        if scope_id is None:
+            raise NotFound()
+        return {"scope": scope, "scope_id": scope_id}
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        """Создать (POST) или изменить (PATCH) список произведений."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(
+                {"non_field_errors": ["Ожидается список произведений."]}
+            )
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({"non_field_errors": [
+                f"Не больше {BULK_MAX_ITEMS} произведений за запрос."
+            ]})
+        results = BulkTitleWriter(
+            items, partial=request.method == "PATCH"
+        ).save()
+        codes = {result["status"] for result in results}
+        if len(codes) > 1:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = codes.pop() if codes else status.HTTP_200_OK
+        return Response(results, status=code)
 
     def get_serializer_class(self):
         if self.request.method == "GET":
@@ -56,41 +305,116 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    CachedResponseMixin,
+    ConditionalRequestMixin,
+    NestedParentMixin,
+    ValuesListMixin,
+    EagerLoadingMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
     permission_classes = (IsAuthorOrModerOrAdminOrReadOnly,)
+    keyset_ordering = ("pub_date", "pk")
+    cache_resources = ("titles", "reviews", "comments", "usernames")
+    parent_model = Title
+    parent_field = "title"
+    parent_lookups = {"pk": "title_id"}
+    lookup_value_regex = r"[1-9]\d*"
 
-    def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs.get("title_id"))
-
-    def get_queryset(self):
-        return self.get_title().reviews.all()
+    def get_conditional_validators(self):
+        """Для списка — по произведению, для отзыва — по самому отзыву,
+        чтобы чужие отзывы не ломали его If-Match."""
+        if self.detail:
+            review = Review.objects.filter(
+                pk=self.kwargs["pk"], title_id=self.kwargs.get("title_id")
+            ).values_list("pk", "text", "score", "comments_count").first()
+            if review is None:
+                return None, None
+            versions = self.get_resource_versions(("usernames",))
+            return [*review, *versions.values()], None
+        title = Title.objects.filter(
+            pk=self.kwargs.get("title_id")
+        ).values_list("modified", "rating_count").first()
+        if title is None:
+            return None, None
+        versions = self.get_resource_versions(("usernames",))
+        return [*title, *versions.values()], title[0]
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        """Вставить отзыв сразу, без предварительной проверки.
+
+        Повторный отзыв отсекает ограничение "unique review"; вставка и
+        пересчёт рейтинга идут в одной транзакции.
+        """
+        title = self.get_parent()
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=title, author=self.request.user
+            ).exists():
+                raise
+            raise ValidationError({"non_field_errors": [
+                MESSAGE_REVIEW_EXISTS
+            ]})
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    CachedResponseMixin,
+    ConditionalRequestMixin,
+    NestedParentMixin,
+    ValuesListMixin,
+    EagerLoadingMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
     permission_classes = (IsAuthorOrModerOrAdminOrReadOnly,)
+    keyset_ordering = ("pub_date", "pk")
+    cache_resources = ("titles", "reviews", "comments", "usernames")
+    parent_model = Review
+    parent_field = "review"
+    parent_lookups = {"pk": "review_id", "title_id": "title_id"}
+    parent_related = ("title",)
+    lookup_value_regex = r"[1-9]\d*"
 
-    def get_review(self):
-        return get_object_or_404(Review, id=self.kwargs.get("review_id"))
-
-    def get_queryset(self):
-        return self.get_review().comments.all()
+    def get_conditional_validators(self):
+        """Для списка — по произведению, для комментария — по нему
+        самому."""
+        if self.detail:
+            comment = Comment.objects.filter(
+                pk=self.kwargs["pk"],
+                review_id=self.kwargs.get("review_id"),
+                review__title_id=self.kwargs.get("title_id"),
+            ).values_list("pk", "text", "pub_date").first()
+            if comment is None:
+                return None, None
+            versions = self.get_resource_versions(("usernames",))
+            return [*comment, *versions.values()], None
+        modified = Title.objects.filter(
+            pk=self.kwargs.get("title_id"),
+            reviews=self.kwargs.get("review_id"),
+        ).values_list("modified", flat=True).first()
+        if modified is None:
+            return None, None
+        versions = self.get_resource_versions(("usernames",))
+        return [modified, *versions.values()], modified
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(author=self.request.user, review=self.get_parent())
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Users.objects.all()
     serializer_class = UsersSerializer
     permission_classes = (IsAdminOnly,)
     lookup_field = "username"
-    filter_backends = (SearchFilter,)
+    filter_backends = (IndexedSearchFilter,)
     search_fields = ("username",)
+    keyset_ordering = ("pk",)
     http_method_names = ["get", "post", "head", "patch", "delete"]
 
     @action(
@@ -101,16 +425,55 @@ class UsersViewSet(viewsets.ModelViewSet):
         url_name="me",
     )
     def info_about_user(self, request):
-        user = request.user
         if request.method == "GET":
-            serializer = self.get_serializer(user)
+            serializer = self.get_serializer(request.user)
             return Response(serializer.data, status=status.HTTP_200_OK)
+        # request.user собран из токена и кэша: правим свежую строку.
+        user = get_object_or_404(Users, pk=request.user.pk)
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save(role=user.role, partial=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class UserFeedViewSet(
+    ValuesListMixin,
+    EagerLoadingMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet
+):
+    """Записи одного пользователя по всем произведениям, новые сначала.
+
+    users/me/... — свои, users/{username}/... — чужие, для админа.
+    Страницы выбираются по индексу (author, pub_date, id) без OFFSET,
+    поэтому десятая страница стоит столько же, сколько первая.
+    """
+
+    permission_classes = (IsSelfOrAdmin,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-pub_date", "-pk")
+
+    def get_author(self):
+        username = self.kwargs["username"]
+        if username == "me":
+            return self.request.user
+        return get_object_or_404(Users.objects.only("pk"), username=username)
+
+    def get_queryset(self):
+        model = self.get_serializer_class().Meta.model
+        return model.objects.filter(author=self.get_author())
+
+
+class UserReviewViewSet(UserFeedViewSet):
+    serializer_class = UserReviewSerializer
+    values_serializer_class = UserReviewValuesSerializer
+
+
+class UserCommentViewSet(UserFeedViewSet):
+    serializer_class = UserCommentSerializer
+    values_serializer_class = UserCommentValuesSerializer
+
+
 @api_view(["POST"])
 def get_token(request):
     """Функция получения токена при регистрации."""
@@ -122,7 +485,7 @@ def get_token(request):
         "confirmation_code"
     )
     if default_token_generator.check_token(user, confirmation_code):
-        token = AccessToken.for_user(user)
+        token = access_token_for(user)
         return response.Response(
             {"token": str(token)},
             status=status.HTTP_200_OK
@@ -137,11 +500,6 @@ class SignUp(APIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = SignUpSerializer
 
-    @staticmethod
-    def send_email(data):
-        email = EmailMessage(body=data["email_body"], to=[data["to_email"]])
-        email.send()
-
     def post(self, request):
         data = request.data
         serializer = self.serializer_class(data=data)
@@ -161,11 +519,72 @@ class SignUp(APIView):
             )
 
         code = default_token_generator.make_token(user)
-        data = {
-            "email_body": f"{user.username}, {code}",
-            "to_email": user.email,
-        }
-        self.send_email(data)
+        OutboxEmail.objects.enqueue(
+            to=user.email, body=f"{user.username}, {code}"
+        )
         return response.Response(
             serializer.data, status=status.HTTP_200_OK
         )
+
+
+class OutboxMetrics(APIView):
+    """Глубина очереди писем и задержка их доставки."""
+
+    permission_classes = (IsAdminOnly,)
+
+    def get(self, request):
+        return Response(outbox_metrics())
+
+
+class Export(APIView):
+    """Потоковая выгрузка таблицы целиком: ?as=ndjson (по умолчанию) или csv.
+
+    Первые байты уходят клиенту сразу, а память не растёт с числом строк.
+    """
+
+    permission_classes = (IsAdminOnly,)
+    format_query_param = "as"
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, resource):
+        if resource not in EXPORTS:
+            raise NotFound()
+        export_format = request.query_params.get(
+            self.format_query_param, "ndjson"
+        )
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({self.format_query_param: [
+                f"Допустимые форматы: {', '.join(sorted(EXPORT_FORMATS))}."
+            ]})
+        content_type, _ = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export_stream(resource, export_format),
+            content_type=f"{content_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{resource}.{export_format}"'
+        )
+        return response
+
+
+class Moderation(APIView):
+    """Массовое удаление отзывов или комментариев модератором.
+
+    В теле — список ids или фильтр (author, title, since, until);
+    с dry_run только считает подходящие строки.
+    """
+
+    permission_classes = (IsModerOrAdmin,)
+
+    def post(self, request, resource):
+        if resource not in MODERATION_MODELS:
+            raise NotFound()
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criteria = serializer.validated_data
+        queryset = moderation_queryset(resource, criteria)
+        if criteria["dry_run"]:
+            return Response({"matched": queryset.count()})
+        return Response(delete_in_batches(queryset))
@@ -9,6 +9,40 @@ MAX_ROLE_LENGTH = 20
 MAX_PASSWORD_LENGTH = 128
 MESSAGE_EMAIL_EXISTS = 'Этот email уже занят'
 MESSAGE_USERNAME_EXISTS = 'Это имя уже занят'
+MESSAGE_REVIEW_EXISTS = 'Вы уже оставили озыв на это произведение'
+API_CACHE_ALIAS = "api"
+FACET_YEAR_BUCKET = 10
+BULK_MAX_ITEMS = 1000
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+MODERATION_BATCH_SIZE = 500
+MODERATION_MAX_IDS = 10000
+# Сколько мест хранить в каждом рейтинге лучших произведений.
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", 100))
+# Вес среднего по каталогу в байесовском рейтинге, в отзывах.
+LEADERBOARD_PRIOR_WEIGHT = int(os.getenv("LEADERBOARD_PRIOR_WEIGHT", 10))
+# Раз в столько секунд rebuild_leaderboard --watch проверяет, не устарел
+# ли рейтинг лучших, и перестраивает его.
+LEADERBOARD_INTERVAL = int(os.getenv("LEADERBOARD_INTERVAL", 60))
+# Окна /titles/trending/ в часах; первое — окно по умолчанию.
+TRENDING_WINDOWS = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}
+# Сколько часов хранить часовые бакеты активности до слияния в суточные.
+TRENDING_HOURLY_RETENTION = 48
+# LRU пользователей для JWT-аутентификации: сколько хранить и сколько
+# секунд; смена роли в другом процессе видна не позже этого срока.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 30))
+# Очередь писем: сколько писем отправлять за одно соединение, сколько
+# попыток до "мёртвой" очереди, первая пауза между попытками (растёт
+# вдвое), на сколько секунд воркер забирает пачку и сколько хранить
+# отправленные письма.
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LEASE = 300
+OUTBOX_SENT_RETENTION = 7 * 24 * 3600
+# Отдавать ли reviews_count у произведений и comments_count у отзывов.
+EXPOSE_COUNTERS = os.getenv("EXPOSE_COUNTERS", "True") == "True"
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -86,6 +120,28 @@ DATABASES = {
 }
 
 
+# Cache
+# Ответы API кешируются в API_CACHE_ALIAS. По умолчанию это LRU в памяти
+# процесса; общий для воркеров gunicorn кеш можно включить через
+# API_CACHE_BACKEND, например django.core.cache.backends.filebased.FileBasedCache
+# или django.core.cache.backends.db.DatabaseCache (после createcachetable).
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    API_CACHE_ALIAS: {
+        "BACKEND": os.getenv("API_CACHE_BACKEND", "api.cache.LRUCache"),
+        "LOCATION": os.getenv("API_CACHE_LOCATION", "api-responses"),
+        "TIMEOUT": int(os.getenv("API_CACHE_TIMEOUT", 60 * 60)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("API_CACHE_MAX_ENTRIES", 10000)),
+            "MAX_SIZE": int(os.getenv("API_CACHE_MAX_SIZE", 64 * 1024 * 1024)),
+        },
+    },
+}
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -129,12 +185,21 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.OptInKeysetPagination",
     "PAGE_SIZE": 10,
 }
 
@@ -0,0 +1,127 @@
+import csv
+import datetime
+import json
+from collections import namedtuple
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from api_yamdb.settings import EXPORT_BUFFER_SIZE, EXPORT_CHUNK_SIZE
+from .models import Comment, GenreTitle, Review, Title
+
+ExportSpec = namedtuple("ExportSpec", ("model", "columns"))
+
+
+# Колонки совпадают с файлами static/data (жанры произведений — отдельная
+# выгрузка genre_title), чтобы выгрузку можно было загрузить обратно
+# командой load_csv. Пары: имя колонки и поле для values_list().
+EXPORTS = {
+    "titles": ExportSpec(
+        Title,
+        (
+            ("id", "id"),
+            ("name", "name"),
+            ("year", "year"),
+            ("description", "description"),
+            ("category_id", "category_id"),
+        ),
+    ),
+    "genre_title": ExportSpec(
+        GenreTitle,
+        (
+            ("id", "id"),
+            ("title_id", "title_id"),
+            ("genre_id", "genre_id"),
+        ),
+    ),
+    "reviews": ExportSpec(
+        Review,
+        (
+            ("id", "id"),
+            ("title_id", "title_id"),
+            ("text", "text"),
+            ("author", "author_id"),
+            ("score", "score"),
+            ("pub_date", "pub_date"),
+        ),
+    ),
+    "comments": ExportSpec(
+        Comment,
+        (
+            ("id", "id"),
+            ("review_id", "review_id"),
+            ("text", "text"),
+            ("author_id", "author_id"),
+            ("pub_date", "pub_date"),
+        ),
+    ),
+}
+
+
+def export_header(resource):
+    spec = EXPORTS[resource]
+    return [column for column, _ in spec.columns]
+
+
+def export_rows(resource, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки выгрузки словарями в порядке первичного ключа.
+
+    Строки читаются через iterator() (в PostgreSQL — серверным курсором)
+    пачками по chunk_size, поэтому вся таблица в памяти не держится.
+    """
+    spec = EXPORTS[resource]
+    names = export_header(resource)
+    rows = spec.model.objects.order_by("pk").values_list(
+        *(field for _, field in spec.columns)
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(names, row))
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+    return value
+
+
+def ndjson_lines(items, header):
+    for item in items:
+        yield json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+
+def csv_lines(items, header):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for item in items:
+        yield writer.writerow([_csv_value(item[name]) for name in header])
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv", csv_lines),
+}
+
+
+def export_stream(resource, export_format, buffer_size=EXPORT_BUFFER_SIZE):
+    """Генератор текста выгрузки блоками примерно по buffer_size символов."""
+    header = export_header(resource)
+    _, writer = EXPORT_FORMATS[export_format]
+    buffer = []
+    size = 0
+    for line in writer(export_rows(resource), header):
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
@@ -0,0 +1,108 @@
+"""Рейтинг лучших произведений по байесовскому среднему.
+
+Оценка произведения — (C * m + сумма оценок) / (C + число оценок), где m —
+средняя оценка по всему каталогу, а C — LEADERBOARD_PRIOR_WEIGHT. Пока
+отзывов мало, оценка близка к средней по каталогу, поэтому одна десятка не
+обгоняет тысячу девяток. Места хранятся в TitleRank и перестраиваются
+целиком командой rebuild_leaderboard вне запросов: по расписанию или
+фоновым процессом с --watch, который каждые LEADERBOARD_INTERVAL секунд
+проверяет, не устарел ли рейтинг. Запись отзыва только помечает его
+устаревшим, сдвигая Title.modified.
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Sum, Value
+from django.db.models.functions import Cast
+from django.dispatch import Signal
+from django.utils import timezone
+
+from api_yamdb.settings import LEADERBOARD_PRIOR_WEIGHT, LEADERBOARD_SIZE
+from .models import GenreTitle, Title, TitleRank
+
+leaderboard_rebuilt = Signal()
+
+
+def bayesian_titles():
+    """Произведения с отзывами и их байесовской оценкой в score."""
+    totals = Title.objects.aggregate(
+        total=Sum("rating_sum"), count=Sum("rating_count")
+    )
+    if not totals["count"]:
+        return Title.objects.none().annotate(
+            score=Value(0, output_field=FloatField())
+        )
+    prior = LEADERBOARD_PRIOR_WEIGHT * totals["total"] / totals["count"]
+    return Title.objects.filter(rating_count__gt=0).annotate(score=(
+        (Cast("rating_sum", FloatField()) + Value(prior))
+        / (F("rating_count") + Value(LEADERBOARD_PRIOR_WEIGHT))
+    ))
+
+
+def build_ranks(built_at):
+    """Места во всех рейтингах: по LEADERBOARD_SIZE лучших в каждом."""
+    genres = {}
+    for title_id, genre_id in GenreTitle.objects.filter(
+        title__rating_count__gt=0
+    ).values_list("title_id", "genre_id"):
+        genres.setdefault(title_id, []).append(genre_id)
+    sizes = {}
+    ranks = []
+    titles = bayesian_titles().order_by("-score", "pk").values_list(
+        "pk", "category_id", "score"
+    )
+    for title_id, category_id, score in titles:
+        scopes = [(TitleRank.ALL, 0)]
+        if category_id is not None:
+            scopes.append((TitleRank.CATEGORY, category_id))
+        scopes.extend(
+            (TitleRank.GENRE, genre_id)
+            for genre_id in genres.get(title_id, ())
+        )
+        for scope in scopes:
+            position = sizes.get(scope, 0) + 1
+            if position > LEADERBOARD_SIZE:
+                continue
+            sizes[scope] = position
+            ranks.append(TitleRank(
+                scope=scope[0],
+                scope_id=scope[1],
+                position=position,
+                title_id=title_id,
+                score=score,
+                built_at=built_at,
+            ))
+    return ranks
+
+
+def rebuild_leaderboard():
+    """Перестроить все рейтинги; возвращает число записанных мест."""
+    ranks = build_ranks(timezone.now())
+    with transaction.atomic():
+        TitleRank.objects.all().delete()
+        TitleRank.objects.bulk_create(ranks, batch_size=1000)
+    leaderboard_rebuilt.send(sender=TitleRank)
+    return len(ranks)
+
+
+def last_built_at():
+    return TitleRank.objects.aggregate(built_at=Max("built_at"))["built_at"]
+
+
+def leaderboard_is_stale():
+    """Менялись ли рейтинги произведений после последнего построения.
+
+    Удалённое произведение уходит из TitleRank каскадом и оставляет
+    пропуск в местах или укорачивает общий рейтинг — такой рейтинг тоже
+    считается устаревшим.
+    """
+    rated = Title.objects.filter(rating_count__gt=0)
+    built_at = last_built_at()
+    if built_at is None:
+        return rated.exists()
+    if Title.objects.filter(modified__gt=built_at).exists():
+        return True
+    ranked = TitleRank.objects.filter(scope=TitleRank.ALL).count()
+    if ranked < LEADERBOARD_SIZE and ranked < rated.count():
+        return True
+    return TitleRank.objects.values("scope", "scope_id").annotate(
+        count=Count("pk"), last=Max("position")
+    ).filter(count__lt=F("last")).exists()
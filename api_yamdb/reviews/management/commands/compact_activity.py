@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import TitleActivity
+
+
+class Command(BaseCommand):
+    help = (
+        "Сливает старые часовые бакеты активности произведений в суточные "
+        "и удаляет бакеты за пределами самого длинного окна трендов. "
+        "Рассчитана на ежечасный запуск по расписанию."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Пересчитать бакеты с нуля по отзывам и комментариям.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            buckets = TitleActivity.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Бакеты пересчитаны: {buckets}."
+            ))
+            return
+        merged = TitleActivity.objects.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f"Слито часовых бакетов: {merged}."
+        ))
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from reviews.export import EXPORT_FORMATS, EXPORTS, export_stream
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково выгружает произведения, их жанры, отзывы или "
+        "комментарии в NDJSON или CSV, не держа всю таблицу в памяти."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=sorted(EXPORTS))
+        parser.add_argument(
+            "--as",
+            dest="export_format",
+            choices=sorted(EXPORT_FORMATS),
+            default="ndjson",
+            help="Формат выгрузки, по умолчанию ndjson.",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="Файл для выгрузки; по умолчанию stdout.",
+        )
+
+    def handle(self, *args, **options):
+        stream = export_stream(options["resource"], options["export_format"])
+        if not options["output"]:
+            for block in stream:
+                sys.stdout.write(block)
+            return
+        with open(
+            options["output"], "w", encoding="utf-8", newline=""
+        ) as file:
+            for block in stream:
+                file.write(block)
@@ -0,0 +1,375 @@
+import csv
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    connections,
+    models as db_models,
+    transaction
+)
+from django.db.models.deletion import get_candidate_relations_to_delete
+from import_export.signals import post_import
+
+from api_yamdb.settings import BASE_DIR
+from reviews.leaderboard import rebuild_leaderboard
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+    TitleActivity,
+    TitleScore
+)
+from users.models import Users
+
+DEFAULT_PATH = os.path.join(BASE_DIR, "static", "data")
+DEFAULT_BATCH_SIZE = 5000
+# Файлы static/data и модели, в которые они загружаются.
+CSV_FILES = {
+    "users.csv": Users,
+    "category.csv": Category,
+    "genre.csv": Genre,
+    "titles.csv": Title,
+    "genre_title.csv": GenreTitle,
+    "review.csv": Review,
+    "comments.csv": Comment,
+}
+
+
+def dependency_order(models):
+    """Модели так, чтобы каждая шла после моделей, на которые ссылается."""
+    ordered = []
+    pending = list(models)
+    while pending:
+        for model in pending:
+            parents = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model is not model
+            }
+            if not parents & (set(pending) - {model}):
+                ordered.append(model)
+                pending.remove(model)
+                break
+        else:
+            raise CommandError(
+                "Циклическая зависимость между таблицами: "
+                f"{', '.join(model.__name__ for model in pending)}"
+            )
+    return ordered
+
+
+def column_fields(model, header):
+    """Поле модели для каждой колонки CSV (author -> author_id)."""
+    fields = {}
+    for field in model._meta.concrete_fields:
+        fields[field.name] = field
+        fields[field.attname] = field
+    missing = [column for column in header if column not in fields]
+    if missing:
+        raise CommandError(
+            f"{model.__name__}: неизвестные колонки {', '.join(missing)}"
+        )
+    return [fields[column] for column in header]
+
+
+@contextmanager
+def keep_csv_dates(fields):
+    """Не подменять даты из CSV текущим временем (auto_now_add)."""
+    patched = [
+        field for field in fields if getattr(field, "auto_now_add", False)
+    ]
+    for field in patched:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in patched:
+            field.auto_now_add = True
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace(
+        "\n", "\\n"
+    ).replace("\r", "\\r")
+
+
+class CopyStream:
+    """Файлоподобная обёртка над генератором строк для COPY FROM STDIN."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+class Command(BaseCommand):
+    help = (
+        "Быстро загружает CSV из static/data (или другого каталога) "
+        "пачками bulk_create или через COPY в PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=DEFAULT_PATH,
+            help="Каталог с CSV-файлами.",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=sorted(CSV_FILES),
+            help="Загрузить только эти файлы.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Строк в одном INSERT для bulk_create.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже в PostgreSQL.",
+        )
+        parser.add_argument(
+            "--defer-checks",
+            action="store_true",
+            help=(
+                "Проверить внешние ключи один раз в конце, а индексы "
+                "из Meta.indexes построить заново после загрузки."
+            ),
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Перед загрузкой удалить строки загружаемых таблиц.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.connection = connections[options["database"]]
+        self.options = options
+        files = {
+            model: name for name, model in CSV_FILES.items()
+            if not options["only"] or name in options["only"]
+        }
+        models = dependency_order(files)
+        touched = list(models)
+        with transaction.atomic(using=self.connection.alias):
+            if options["clear"]:
+                touched.extend(
+                    model for model in self.clear_tables(reversed(models))
+                    if model not in touched
+                )
+            with ExitStack() as stack:
+                if options["defer_checks"]:
+                    stack.enter_context(
+                        self.connection.constraint_checks_disabled()
+                    )
+                    stack.enter_context(self.indexes_dropped(models))
+                for model in models:
+                    self.load(
+                        model, os.path.join(options["path"], files[model])
+                    )
+            if options["defer_checks"]:
+                self.connection.check_constraints(
+                    table_names=[model._meta.db_table for model in models]
+                )
+            self.reset_sequences(models)
+            if Title in touched or Review in touched:
+                Title.objects.using(self.connection.alias).recalculate_rating()
+                TitleScore.objects.using(self.connection.alias).rebuild()
+            if Review in touched or Comment in touched:
+                Review.objects.using(
+                    self.connection.alias
+                ).recalculate_comments_count()
+                TitleActivity.objects.using(self.connection.alias).rebuild()
+            if Title in touched or Review in touched:
+                rebuild_leaderboard()
+        for model in touched:
+            post_import.send(sender=self.__class__, model=model)
+
+    def clear_tables(self, models):
+        """Очистить таблицы и всё, что ссылается на них каскадно, одним
+        DELETE на таблицу; возвращает очищенные модели.
+
+        В отличие от QuerySet.delete() строки не загружаются в память и
+        сигналы на каждую не вызываются: рейтинги, счётчики и активность
+        всё равно пересчитываются после загрузки.
+        """
+        cleared = []
+        seen = set()
+
+        def visit(model):
+            model = model._meta.concrete_model
+            if model in seen:
+                return
+            seen.add(model)
+            for relation in get_candidate_relations_to_delete(model._meta):
+                related = relation.related_model._meta.concrete_model
+                if (
+                    relation.on_delete is db_models.CASCADE
+                    and not relation.field.null
+                ):
+                    visit(related)
+                elif relation.on_delete is db_models.SET_NULL:
+                    if related not in seen:
+                        related.objects.using(self.connection.alias).filter(
+                            **{f"{relation.field.name}__isnull": False}
+                        ).update(**{relation.field.name: None})
+                elif relation.on_delete is not db_models.DO_NOTHING:
+                    raise CommandError(
+                        f"{model.__name__}: строки не удалить без проверки "
+                        f"{related.__name__}.{relation.field.name}"
+                    )
+            cleared.append(model)
+
+        for model in models:
+            visit(model)
+        for model in cleared:
+            model.objects.using(self.connection.alias).all()._raw_delete(
+                self.connection.alias
+            )
+        return cleared
+
+    @contextmanager
+    def indexes_dropped(self, models):
+        """Снять индексы Meta.indexes на время загрузки и построить заново.
+
+        Только для PostgreSQL: там DDL транзакционный, а SQLite не даёт
+        менять схему внутри transaction.atomic().
+        """
+        indexed = []
+        if self.connection.vendor == "postgresql":
+            indexed = [
+                (model, index)
+                for model in models for index in model._meta.indexes
+            ]
+        if not indexed:
+            yield
+            return
+        with self.connection.schema_editor(atomic=False) as editor:
+            for model, index in indexed:
+                editor.remove_index(model, index)
+        yield
+        started = time.perf_counter()
+        with self.connection.schema_editor(atomic=False) as editor:
+            for model, index in indexed:
+                editor.add_index(model, index)
+        self.stdout.write(
+            f"индексы: {len(indexed)} за "
+            f"{time.perf_counter() - started:.2f} с"
+        )
+
+    def load(self, model, path):
+        if not os.path.exists(path):
+            raise CommandError(f"Нет файла {path}")
+        started = time.perf_counter()
+        with open(path, encoding="utf-8-sig", newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            fields = column_fields(model, header)
+            objects = self.build_objects(model, fields, reader, path)
+            try:
+                with keep_csv_dates(fields):
+                    if (
+                        self.connection.vendor == "postgresql"
+                        and not self.options["no_copy"]
+                    ):
+                        count = self.copy(model, objects, fields)
+                    else:
+                        count = self.insert(model, objects)
+            except IntegrityError as error:
+                raise CommandError(f"{path}: {error}")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{model._meta.db_table}: {count} строк за {elapsed:.2f} с "
+            f"({count / elapsed if elapsed else count:.0f} строк/с)"
+        )
+
+    @staticmethod
+    def build_objects(model, fields, reader, path):
+        for line, row in enumerate(reader, start=2):
+            values = {}
+            for field, raw in zip(fields, row):
+                try:
+                    if raw == "" and field.null:
+                        values[field.attname] = None
+                    else:
+                        values[field.attname] = field.to_python(raw)
+                except ValidationError as error:
+                    raise CommandError(
+                        f"{path}:{line}: {field.name}: "
+                        f"{'; '.join(error.messages)}"
+                    )
+            yield model(**values)
+
+    def insert(self, model, objects):
+        count = 0
+        manager = model.objects.using(self.connection.alias)
+        batch_size = self.options["batch_size"]
+        while True:
+            batch = list(islice(objects, batch_size))
+            if not batch:
+                return count
+            manager.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+
+    def copy(self, model, objects, header_fields):
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key or field in header_fields
+        ]
+        counter = [0]
+
+        def lines():
+            for obj in objects:
+                counter[0] += 1
+                yield "\t".join(
+                    _copy_value(field.get_db_prep_save(
+                        field.pre_save(obj, add=True), self.connection
+                    ))
+                    for field in fields
+                ) + "\n"
+
+        columns = ", ".join(
+            self.connection.ops.quote_name(field.column) for field in fields
+        )
+        table = self.connection.ops.quote_name(model._meta.db_table)
+        with self.connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN", CopyStream(lines())
+            )
+        return counter[0]
+
+    def reset_sequences(self, models):
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), models
+        )
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Review, Title, TitleScore
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сохранённые рейтинги и распределения оценок "
+        "произведений и счётчики комментариев отзывов или, с --check, "
+        "только ищет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить расхождения, ничего не меняя.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(
+            Title.objects.with_rating_drift().values_list("pk", flat=True)
+        )
+        drifted_scores = TitleScore.objects.drifted_titles()
+        drifted_comments = list(
+            Review.objects.with_comments_count_drift().values_list(
+                "pk", flat=True
+            )
+        )
+        if options["check"]:
+            errors = []
+            if drifted:
+                errors.append(
+                    f"Рейтинг расходится с отзывами у {len(drifted)} "
+                    f"произведений: {drifted[:20]}"
+                )
+            if drifted_scores:
+                errors.append(
+                    "Распределение оценок расходится с отзывами у "
+                    f"{len(drifted_scores)} произведений: "
+                    f"{drifted_scores[:20]}"
+                )
+            if drifted_comments:
+                errors.append(
+                    "Счётчик комментариев расходится у "
+                    f"{len(drifted_comments)} отзывов: {drifted_comments[:20]}"
+                )
+            if errors:
+                raise CommandError("\n".join(errors))
+            self.stdout.write(self.style.SUCCESS("Расхождений нет."))
+            return
+        with transaction.atomic():
+            updated = Title.objects.recalculate_rating()
+            TitleScore.objects.rebuild()
+            Review.objects.recalculate_comments_count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчитано произведений: {updated}, "
+            f"исправлено расхождений: {len(drifted)}, "
+            f"в распределениях оценок: {len(drifted_scores)}, "
+            f"в счётчиках комментариев: {len(drifted_comments)}."
+        ))
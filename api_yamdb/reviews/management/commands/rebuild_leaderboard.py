@@ -0,0 +1,66 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from api_yamdb.settings import LEADERBOARD_INTERVAL
+from reviews.leaderboard import leaderboard_is_stale, rebuild_leaderboard
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает рейтинги лучших произведений всего каталога, "
+        "категорий и жанров. Рассчитана на запуск по расписанию или, "
+        "с --watch, фоновым процессом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--if-stale",
+            action="store_true",
+            help="Перестроить, только если рейтинги произведений менялись.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Не выходить: проверять рейтинг каждые --interval секунд.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=LEADERBOARD_INTERVAL,
+            help="Пауза между проверками в режиме --watch.",
+        )
+
+    def handle(self, *args, **options):
+        if options["watch"]:
+            self.watch(options["interval"])
+            return
+        if options["if_stale"] and not leaderboard_is_stale():
+            self.stdout.write("Рейтинг актуален.")
+            return
+        self.rebuild()
+
+    def rebuild(self):
+        ranks = rebuild_leaderboard()
+        self.stdout.write(self.style.SUCCESS(
+            f"Рейтинг перестроен, мест: {ranks}."
+        ))
+
+    def watch(self, interval):
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    if leaderboard_is_stale():
+                        self.rebuild()
+                except DatabaseError:
+                    # Например, рейтинг одновременно перестроил другой
+                    # процесс: следующая проверка попробует снова.
+                    logger.exception("Рейтинг лучших не перестроен")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            return
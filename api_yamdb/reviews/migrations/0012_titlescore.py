@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 18:58
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_scores(apps, schema_editor):
+    TitleScore = apps.get_model('reviews', 'TitleScore')
+    Review = apps.get_model('reviews', 'Review')
+    TitleScore.objects.bulk_create(
+        TitleScore(title_id=title_id, score=score, count=total)
+        for title_id, score, total in Review.objects.order_by().values_list(
+            'title_id', 'score'
+        ).annotate(total=Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_genretitle_genre_title_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)])),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='reviews.title')),
+            ],
+            options={
+                'verbose_name': 'Распределение оценок',
+                'verbose_name_plural': 'Распределения оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlescore',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique title score'),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 3.2 on 2026-10-18 19:20
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def fill_activity(apps, schema_editor):
+    """Часовые бакеты за 30 дней; в суточные их сольёт compact_activity."""
+    TitleActivity = apps.get_model('reviews', 'TitleActivity')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    since = timezone.now() - datetime.timedelta(days=30)
+    totals = {}
+    sources = (
+        (Review.objects.all(), 'title_id'),
+        (Comment.objects.all(), 'review__title_id'),
+    )
+    for index, (rows, title_field) in enumerate(sources):
+        rows = rows.filter(pub_date__gte=since).order_by().annotate(
+            hour=TruncHour('pub_date')
+        ).values_list(title_field, 'hour').annotate(total=Count('pk'))
+        for title_id, hour, total in rows:
+            totals.setdefault((title_id, hour), [0, 0])[index] += total
+    TitleActivity.objects.bulk_create(
+        TitleActivity(
+            title_id=title_id, start=hour, reviews=reviews, comments=comments
+        )
+        for (title_id, hour), (reviews, comments) in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_titlerank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='Начало')),
+                ('hours', models.PositiveSmallIntegerField(default=1, verbose_name='Длительность, ч')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='Отзывы')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментарии')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='reviews.title')),
+            ],
+            options={
+                'verbose_name': 'Активность',
+                'verbose_name_plural': 'Активность по произведениям',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleactivity',
+            index=models.Index(fields=['start', 'title'], name='titleactivity_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleactivity',
+            constraint=models.UniqueConstraint(fields=('title', 'start', 'hours'), name='unique title activity bucket'),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
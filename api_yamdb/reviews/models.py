@@ -1,9 +1,21 @@
+import datetime
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Avg, Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, TruncHour
+from django.utils import timezone
 
 from reviews.validators import validate_year
 from users.models import Users
-from api_yamdb.settings import MAX_MODELS_NAME_LENGTH, MAX_SLUG_LENGTH
+from api_yamdb.settings import (
+    MAX_MODELS_NAME_LENGTH,
+    MAX_SLUG_LENGTH,
+    TRENDING_HOURLY_RETENTION,
+    TRENDING_WINDOWS
+)
 
 MIN_SCORE = 1
 MAX_SCORE = 10
@@ -25,16 +37,71 @@ class GenreCategoryBase(models.Model):
 class Genre(GenreCategoryBase):
 
     class Meta:
+        ordering = ("id",)
         verbose_name = "Жанр"
         verbose_name_plural = "Жанры"
 
 
 class Category(GenreCategoryBase):
     class Meta:
+        ordering = ("id",)
         verbose_name = "Категории"
         verbose_name_plural = "Категории"
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def touch(self):
+        """Отметить, что изменилось произведение или его отзывы."""
+        return self.update(modified=timezone.now())
+
+    def shift_rating(self, score_delta, count_delta):
+        """Сдвинуть сумму и количество оценок и пересчитать рейтинг."""
+        rating_sum = F("rating_sum") + score_delta
+        rating_count = F("rating_count") + count_delta
+        return self.update(
+            modified=timezone.now(),
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=Case(
+                When(rating_count__lte=-count_delta, then=Value(None)),
+                default=Cast(rating_sum, FloatField()) / rating_count,
+                output_field=FloatField(),
+            ),
+        )
+
+    def recalculate_rating(self):
+        """Пересчитать рейтинг с нуля по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef("pk")
+        ).order_by().values("title")
+        return self.update(
+            modified=timezone.now(),
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count("pk")).values("total")),
+                0
+            ),
+            rating=Subquery(
+                reviews.annotate(average=Avg("score")).values("average"),
+                output_field=FloatField()
+            ),
+        )
+
+    def with_rating_drift(self):
+        """Произведения, у которых сохранённый рейтинг разошёлся с отзывами."""
+        return self.annotate(
+            actual_sum=Coalesce(Sum("reviews__score"), 0),
+            actual_count=Count("reviews"),
+        ).exclude(
+            rating_sum=F("actual_sum"),
+            rating_count=F("actual_count"),
+        )
+
+
 class Title(models.Model):
     name = models.CharField(
         max_length=MAX_MODELS_NAME_LENGTH
@@ -57,11 +124,70 @@ class Title(models.Model):
         related_name="genre",
         through="GenreTitle"
     )
+    rating_sum = models.PositiveIntegerField(
+        "Сумма оценок",
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        "Количество оценок",
+        default=0,
+        editable=False
+    )
+    rating = models.FloatField(
+        "Рейтинг",
+        null=True,
+        blank=True,
+        editable=False
+    )
+    modified = models.DateTimeField(
+        "Дата изменения",
+        auto_now=True
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["-rating", "id"],
+                name="title_rating_idx"
+            ),
+            models.Index(
+                fields=["category", "-rating", "id"],
+                name="title_category_rating_idx"
+            ),
+            models.Index(
+                fields=["year", "id"],
+                name="title_year_idx"
+            ),
+        ]
         verbose_name = "Произведение"
         verbose_name_plural = "Произведения"
 
+    # Поля рейтинга, которые меняют только сигналы отзывов.
+    RATING_FIELDS = ("rating_sum", "rating_count", "rating")
+
+    def save(self, *args, **kwargs):
+        """Сохранить произведение, не затирая рейтинг.
+
+        Как и comments_count у отзыва, поля рейтинга при обновлении не
+        попадают в UPDATE, и параллельный отзыв не теряется.
+        """
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class GenreTitle(models.Model):
     title = models.ForeignKey(
@@ -73,6 +199,175 @@ class GenreTitle(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["genre", "title"],
+                name="genretitle_genre_title_idx"
+            ),
+        ]
+
+
+class TitleScoreQuerySet(models.QuerySet):
+
+    def shift(self, title_id, score, delta):
+        """Изменить число отзывов с оценкой score у произведения на delta.
+
+        Счётчик не уходит ниже нуля: расхождение найдёт и исправит
+        rebuild_aggregates.
+        """
+        counter = self.filter(title_id=title_id, score=score)
+        updated = counter.filter(count__gte=-delta).update(
+            count=F("count") + delta
+        )
+        if updated or delta <= 0:
+            return
+        self.bulk_create(
+            [self.model(title_id=title_id, score=score)],
+            ignore_conflicts=True
+        )
+        counter.update(count=F("count") + delta)
+
+    def grouped_reviews(self, titles=None):
+        """Число отзывов по (произведение, оценка) одним запросом."""
+        reviews = Review.objects.using(self.db)
+        if titles is not None:
+            reviews = reviews.filter(title__in=titles)
+        return reviews.order_by().values_list("title_id", "score").annotate(
+            total=Count("pk")
+        )
+
+    def rebuild(self, titles=None):
+        """Пересчитать счётчики с нуля (для всех или для titles)."""
+        stale = self if titles is None else self.filter(title__in=titles)
+        stale.delete()
+        return len(self.bulk_create(
+            TitleScore(title_id=title_id, score=score, count=total)
+            for title_id, score, total in self.grouped_reviews(titles)
+        ))
+
+    def drifted_titles(self):
+        """id произведений, у которых счётчики разошлись с отзывами."""
+        stored = {
+            (title_id, score): count
+            for title_id, score, count in self.exclude(count=0).values_list(
+                "title_id", "score", "count"
+            )
+        }
+        actual = {
+            (title_id, score): total
+            for title_id, score, total in self.grouped_reviews()
+        }
+        return sorted({
+            title_id for (title_id, score) in stored.keys() | actual.keys()
+            if stored.get((title_id, score)) != actual.get((title_id, score))
+        })
+
+
+class TitleScore(models.Model):
+    """Сколько отзывов произведения поставили каждую оценку."""
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name="scores"
+    )
+    score = models.PositiveSmallIntegerField(
+        validators=[
+            MinValueValidator(MIN_SCORE),
+            MaxValueValidator(MAX_SCORE),
+        ]
+    )
+    count = models.PositiveIntegerField(
+        "Количество отзывов",
+        default=0
+    )
+
+    objects = TitleScoreQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["title", "score"],
+                name="unique title score"
+            )
+        ]
+        verbose_name = "Распределение оценок"
+        verbose_name_plural = "Распределения оценок"
+
+
+class TitleRank(models.Model):
+    """Место произведения в рейтинге лучших: во всём каталоге, в категории
+    или в жанре. Таблицу целиком перестраивает reviews.leaderboard."""
+
+    ALL = "all"
+    CATEGORY = "category"
+    GENRE = "genre"
+
+    SCOPES = (
+        (ALL, "Все произведения"),
+        (CATEGORY, "Категория"),
+        (GENRE, "Жанр"),
+    )
+
+    scope = models.CharField(
+        "Раздел",
+        max_length=10,
+        choices=SCOPES
+    )
+    scope_id = models.PositiveIntegerField(
+        "id категории или жанра",
+        default=0
+    )
+    position = models.PositiveIntegerField(
+        "Место"
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name="ranks"
+    )
+    score = models.FloatField(
+        "Байесовский рейтинг"
+    )
+    built_at = models.DateTimeField(
+        "Дата построения"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "scope_id", "position"],
+                name="unique title rank position"
+            )
+        ]
+        verbose_name = "Место в рейтинге"
+        verbose_name_plural = "Рейтинг лучших произведений"
+
+
+class ReviewQuerySet(models.QuerySet):
+
+    def shift_comments_count(self, delta):
+        """Сдвинуть счётчик комментариев, не опуская его ниже нуля."""
+        return self.filter(comments_count__gte=-delta).update(
+            comments_count=F("comments_count") + delta
+        )
+
+    def recalculate_comments_count(self):
+        """Пересчитать счётчик комментариев с нуля."""
+        comments = Comment.objects.filter(
+            review=OuterRef("pk")
+        ).order_by().values("review").annotate(total=Count("pk"))
+        return self.update(comments_count=Coalesce(
+            Subquery(comments.values("total")), 0
+        ))
+
+    def with_comments_count_drift(self):
+        """Отзывы, у которых сохранённый счётчик разошёлся с комментариями."""
+        return self.annotate(
+            actual_comments_count=Count("comments")
+        ).exclude(comments_count=F("actual_comments_count"))
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -98,6 +393,13 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    comments_count = models.PositiveIntegerField(
+        "Количество комментариев",
+        default=0,
+        editable=False
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -106,9 +408,63 @@ class Review(models.Model):
                 name="unique review"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["title", "pub_date", "id"],
+                name="review_title_pub_date_idx"
+            ),
+            models.Index(
+                fields=["author", "pub_date", "id"],
+                name="review_author_pub_date_idx"
+            ),
+        ]
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохранить отзыв, не затирая comments_count.
+
+        Счётчик меняют только сигналы комментариев, поэтому при обновлении
+        он не попадает в UPDATE и параллельный комментарий не теряется.
+        """
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != "comments_count"
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    def remember_rating_state(self):
+        """Запомнить, какой вклад отзыв сейчас вносит в рейтинг."""
+        self._rating_state = (
+            self.__dict__.get("title_id"),
+            self.__dict__.get("score"),
+        )
+
+    @property
+    def loaded_rating_state(self):
+        """Вклад в рейтинг на момент загрузки или последнего сохранения.
+
+        None, если отзыв загружен без title_id или score.
+        """
+        state = getattr(self, "_rating_state", None)
+        if state is None or None in state:
+            return None
+        return state
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -129,5 +485,235 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["review", "pub_date", "id"],
+                name="comment_review_pub_date_idx"
+            ),
+            models.Index(
+                fields=["author", "pub_date", "id"],
+                name="comment_author_pub_date_idx"
+            ),
+        ]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_review_id = instance.__dict__.get("review_id")
+        return instance
+
+
+def bucket_start(moment, hours):
+    """Начало часового (hours=1) или суточного (hours=24) бакета."""
+    start = moment.replace(minute=0, second=0, microsecond=0)
+    if hours == TitleActivity.DAY:
+        start = start.replace(hour=0)
+    return start
+
+
+class TitleActivityQuerySet(models.QuerySet):
+
+    @staticmethod
+    def retention_start(now):
+        """Самый ранний час, который ещё попадает в самое длинное окно."""
+        return bucket_start(now, TitleActivity.HOUR) - datetime.timedelta(
+            hours=max(TRENDING_WINDOWS.values()) - 1
+        )
+
+    @staticmethod
+    def hourly_start(now):
+        """С этих суток активность хранится по часам, раньше — по суткам."""
+        return bucket_start(
+            now - datetime.timedelta(hours=TRENDING_HOURLY_RETENTION),
+            TitleActivity.DAY
+        )
+
+    def record(self, title_id, moment, reviews=0, comments=0):
+        """Добавить в бакет moment новые отзывы и комментарии.
+
+        Отрицательные значения убирают удалённые строки — из часового
+        бакета или, если он уже слит, из суточного, не опуская счётчики
+        ниже нуля.
+        """
+        changes = {
+            "reviews": F("reviews") + reviews,
+            "comments": F("comments") + comments,
+        }
+        if reviews < 0 or comments < 0:
+            for hours in (TitleActivity.HOUR, TitleActivity.DAY):
+                if self.filter(
+                    title_id=title_id,
+                    start=bucket_start(moment, hours),
+                    hours=hours,
+                    reviews__gte=-reviews,
+                    comments__gte=-comments,
+                ).update(**changes):
+                    return
+            return
+        start = bucket_start(moment, TitleActivity.HOUR)
+        bucket = self.filter(
+            title_id=title_id, start=start, hours=TitleActivity.HOUR
+        )
+        if bucket.update(**changes):
+            return
+        self.bulk_create(
+            [self.model(title_id=title_id, start=start)],
+            ignore_conflicts=True
+        )
+        bucket.update(**changes)
+
+    def compact(self, now=None):
+        """Удалить бакеты старше самого длинного окна и слить часовые
+        бакеты старше TRENDING_HOURLY_RETENTION в суточные.
+
+        Возвращает число слитых часовых бакетов.
+        """
+        now = now or timezone.now()
+        self.filter(start__lt=self.retention_start(now)).delete()
+        hourly = self.filter(
+            hours=TitleActivity.HOUR, start__lt=self.hourly_start(now)
+        )
+        totals = {}
+        merged = 0
+        for title_id, start, reviews, comments in hourly.values_list(
+            "title_id", "start", "reviews", "comments"
+        ):
+            key = (title_id, bucket_start(start, TitleActivity.DAY))
+            total = totals.setdefault(key, [0, 0])
+            total[0] += reviews
+            total[1] += comments
+            merged += 1
+        if not totals:
+            return 0
+        daily = self.filter(
+            hours=TitleActivity.DAY,
+            title_id__in={title_id for title_id, _ in totals},
+            start__in={start for _, start in totals},
+        )
+        for title_id, start, reviews, comments in daily.values_list(
+            "title_id", "start", "reviews", "comments"
+        ):
+            total = totals.setdefault((title_id, start), [0, 0])
+            total[0] += reviews
+            total[1] += comments
+        with transaction.atomic(using=self.db):
+            daily.delete()
+            hourly.delete()
+            self.bulk_create(
+                self.model(
+                    title_id=title_id,
+                    start=start,
+                    hours=TitleActivity.DAY,
+                    reviews=reviews,
+                    comments=comments,
+                )
+                for (title_id, start), (reviews, comments) in totals.items()
+            )
+        return merged
+
+    def rebuild(self, titles=None, now=None):
+        """Пересчитать бакеты с нуля по отзывам и комментариям
+        (для всех произведений или для titles)."""
+        now = now or timezone.now()
+        since = self.retention_start(now)
+        hourly_start = self.hourly_start(now)
+        reviews = Review.objects.using(self.db).filter(pub_date__gte=since)
+        comments = Comment.objects.using(self.db).filter(pub_date__gte=since)
+        if titles is not None:
+            reviews = reviews.filter(title__in=titles)
+            comments = comments.filter(review__title__in=titles)
+        totals = {}
+        sources = ((reviews, "title_id"), (comments, "review__title_id"))
+        for index, (rows, title_field) in enumerate(sources):
+            rows = rows.order_by().annotate(
+                hour=TruncHour("pub_date")
+            ).values_list(title_field, "hour").annotate(total=Count("pk"))
+            for title_id, hour, total in rows:
+                hours = (
+                    TitleActivity.DAY if hour < hourly_start
+                    else TitleActivity.HOUR
+                )
+                key = (title_id, bucket_start(hour, hours), hours)
+                totals.setdefault(key, [0, 0])[index] += total
+        stale = self if titles is None else self.filter(title__in=titles)
+        with transaction.atomic(using=self.db):
+            stale.delete()
+            return len(self.bulk_create(
+                self.model(
+                    title_id=title_id,
+                    start=start,
+                    hours=hours,
+                    reviews=reviews,
+                    comments=comments,
+                )
+                for (title_id, start, hours), (reviews, comments)
+                in totals.items()
+            ))
+
+    def trending(self, hours, now=None):
+        """Произведения по активности за последние hours часов.
+
+        Читаются только бакеты окна, поэтому стоимость зависит от длины
+        окна и числа активных произведений, а не от числа отзывов.
+        Граница окна округляется до начала бакета.
+        """
+        now = now or timezone.now()
+        since = bucket_start(now, TitleActivity.HOUR) - datetime.timedelta(
+            hours=hours - 1
+        )
+        return self.filter(start__gte=since).order_by().values(
+            "title_id"
+        ).annotate(
+            reviews_total=Sum("reviews"),
+            comments_total=Sum("comments"),
+            activity=Sum(F("reviews") + F("comments")),
+        ).order_by("-activity", "title_id")
+
+
+class TitleActivity(models.Model):
+    """Сколько отзывов и комментариев к произведению появилось за час или
+    за сутки, начиная со start."""
+
+    HOUR = 1
+    DAY = 24
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name="activity"
+    )
+    start = models.DateTimeField(
+        "Начало"
+    )
+    hours = models.PositiveSmallIntegerField(
+        "Длительность, ч",
+        default=HOUR
+    )
+    reviews = models.PositiveIntegerField(
+        "Отзывы",
+        default=0
+    )
+    comments = models.PositiveIntegerField(
+        "Комментарии",
+        default=0
+    )
+
+    objects = TitleActivityQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["title", "start", "hours"],
+                name="unique title activity bucket"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["start", "title"],
+                name="titleactivity_start_idx"
+            ),
+        ]
+        verbose_name = "Активность"
+        verbose_name_plural = "Активность по произведениям"
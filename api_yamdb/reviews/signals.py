@@ -0,0 +1,232 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Comment,
+    GenreTitle,
+    Review,
+    Title,
+    TitleActivity,
+    TitleScore
+)
+
+_deferred = threading.local()
+
+
+class DeferredAggregates:
+    """Произведения и отзывы, чьи счётчики пересчитать после пакета."""
+
+    def __init__(self):
+        self.titles = set()
+        self.reviews = set()
+        self.deleted_reviews = set()
+
+    @property
+    def surviving_reviews(self):
+        """Отзывы с удалёнными комментариями, которые сами остались."""
+        return self.reviews - self.deleted_reviews
+
+    def apply(self):
+        if self.titles:
+            Title.objects.filter(pk__in=self.titles).recalculate_rating()
+            TitleScore.objects.rebuild(titles=self.titles)
+        active_titles = set(self.titles)
+        if self.surviving_reviews:
+            reviews = Review.objects.filter(pk__in=self.surviving_reviews)
+            reviews.recalculate_comments_count()
+            active_titles.update(reviews.values_list("title_id", flat=True))
+        if active_titles:
+            TitleActivity.objects.rebuild(titles=active_titles)
+
+
+@contextmanager
+def deferred_aggregates():
+    """Копить удаления отзывов и комментариев и пересчитать рейтинги и
+    счётчики в конце блока — по разу на произведение и отзыв, а не по
+    запросу на каждую удалённую строку.
+
+    Блок должен быть внутри transaction.atomic(), чтобы пересчёт попал
+    в ту же транзакцию.
+    """
+    pending = DeferredAggregates()
+    previous = getattr(_deferred, "pending", None)
+    _deferred.pending = pending
+    try:
+        yield pending
+    finally:
+        _deferred.pending = previous
+    pending.apply()
+
+
+def add_score(title_id, score, delta):
+    """Учесть (delta=1) или убрать (delta=-1) оценку отзыва."""
+    Title.objects.filter(pk=title_id).shift_rating(score * delta, delta)
+    TitleScore.objects.shift(title_id, score, delta)
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    """Поправить рейтинг и распределение оценок после записи отзыва."""
+    old_state = None if created else instance.loaded_rating_state
+    if not created and old_state is None:
+        Title.objects.filter(pk=instance.title_id).recalculate_rating()
+        TitleScore.objects.rebuild(titles=[instance.title_id])
+    elif old_state is None:
+        add_score(instance.title_id, instance.score, 1)
+    else:
+        old_title_id, old_score = old_state
+        if old_title_id == instance.title_id:
+            Title.objects.filter(pk=instance.title_id).shift_rating(
+                instance.score - old_score, 0
+            )
+            if old_score != instance.score:
+                TitleScore.objects.shift(old_title_id, old_score, -1)
+                TitleScore.objects.shift(instance.title_id, instance.score, 1)
+        else:
+            add_score(old_title_id, old_score, -1)
+            add_score(instance.title_id, instance.score, 1)
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    """Убрать оценку удалённого отзыва, в том числе при каскадном удалении."""
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending.titles.add(instance.title_id)
+        pending.deleted_reviews.add(instance.pk)
+        return
+    state = instance.loaded_rating_state
+    if state is None:
+        Title.objects.filter(pk=instance.title_id).recalculate_rating()
+        TitleScore.objects.rebuild(titles=[instance.title_id])
+        return
+    add_score(*state, -1)
+
+
+class PendingTouch:
+    """Произведения, чью дату изменения нужно обновить после коммита."""
+
+    def __init__(self):
+        self.titles = set()
+        self.reviews = set()
+
+    def __call__(self):
+        Title.objects.filter(
+            Q(pk__in=self.titles) | Q(reviews__in=self.reviews)
+        ).distinct().touch()
+
+
+def touch_titles(titles=(), reviews=()):
+    """Обновить Title.modified по id произведений или их отзывов.
+
+    Внутри транзакции обновление одно на коммит, поэтому каскадное
+    удаление отзыва с сотней комментариев не пишет в Title сто раз.
+    """
+    pending = PendingTouch()
+    pending.titles.update(titles)
+    pending.reviews.update(reviews)
+    connection = connections[DEFAULT_DB_ALIAS]
+    if not connection.in_atomic_block:
+        pending()
+        return
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, PendingTouch):
+            callback.titles |= pending.titles
+            callback.reviews |= pending.reviews
+            return
+    transaction.on_commit(pending)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_title_on_comment_change(sender, instance, **kwargs):
+    """Комментарии меняют отзывы произведения, а значит и его ETag."""
+    touch_titles(reviews=[instance.review_id])
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, created, **kwargs):
+    """Учесть новый комментарий или его перенос к другому отзыву."""
+    old_review_id = getattr(instance, "loaded_review_id", None)
+    if created:
+        Review.objects.filter(pk=instance.review_id).shift_comments_count(1)
+    elif old_review_id is not None and old_review_id != instance.review_id:
+        Review.objects.filter(pk=old_review_id).shift_comments_count(-1)
+        Review.objects.filter(pk=instance.review_id).shift_comments_count(1)
+    instance.loaded_review_id = instance.review_id
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_on_delete(sender, instance, **kwargs):
+    """Убрать комментарий из счётчика, в том числе при каскадном удалении."""
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending.reviews.add(instance.review_id)
+        return
+    Review.objects.filter(pk=instance.review_id).shift_comments_count(-1)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_title_on_genre_change(sender, instance, **kwargs):
+    touch_titles(titles=[instance.title_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genre_set(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        touch_titles(titles=[instance.pk])
+    elif pk_set:
+        touch_titles(titles=pk_set)
+
+
+@receiver(post_save, sender=Review)
+def record_review_activity(sender, instance, created, **kwargs):
+    if created:
+        TitleActivity.objects.record(
+            instance.title_id, instance.pub_date, reviews=1
+        )
+
+
+@receiver(post_delete, sender=Review)
+def forget_review_activity(sender, instance, **kwargs):
+    if getattr(_deferred, "pending", None) is None:
+        TitleActivity.objects.record(
+            instance.title_id, instance.pub_date, reviews=-1
+        )
+
+
+def comment_title_id(comment):
+    """Произведение комментария: из загруженного отзыва или подзапросом,
+    без отдельного запроса за отзывом."""
+    if Comment.review.is_cached(comment):
+        return comment.review.title_id
+    return Subquery(
+        Review.objects.filter(pk=comment.review_id).values("title_id")
+    )
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_activity(sender, instance, created, **kwargs):
+    if created:
+        TitleActivity.objects.record(
+            comment_title_id(instance), instance.pub_date, comments=1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment_activity(sender, instance, **kwargs):
+    if getattr(_deferred, "pending", None) is not None:
+        return
+    TitleActivity.objects.record(
+        comment_title_id(instance), instance.pub_date, comments=-1
+    )
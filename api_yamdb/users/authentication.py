@@ -0,0 +1,49 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ClaimsUser, Users
+
+TOKEN_CLAIMS = ("username", "role", "is_staff", "is_superuser")
+TOKEN_VERSION_CLAIM = "token_version"
+
+
+def access_token_for(user):
+    """Access-токен с claims, которых хватает для проверки прав."""
+    token = AccessToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя на каждый запрос.
+
+    request.user — ClaimsUser из claims токена. Отзыв проверяется по
+    token_version из user_cache: запрос к БД нужен не чаще раза в
+    AUTH_USER_CACHE_TIMEOUT секунд на пользователя и процесс. Токены без
+    claims, выданные раньше, проверяются как прежде.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        values = Users.cached_values(user_id)
+        if values is None:
+            raise AuthenticationFailed(
+                "Пользователь не найден.", code="user_not_found"
+            )
+        if not values["is_active"]:
+            raise AuthenticationFailed(
+                "Пользователь неактивен.", code="user_inactive"
+            )
+        if values["token_version"] != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed("Токен отозван.", code="token_revoked")
+        return ClaimsUser.from_values({
+            api_settings.USER_ID_FIELD: user_id,
+            TOKEN_VERSION_CLAIM: values["token_version"],
+            **{claim: validated_token[claim] for claim in TOKEN_CLAIMS},
+        })
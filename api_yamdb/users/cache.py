@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+
+from api_yamdb.settings import AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TIMEOUT
+
+
+class UserCache:
+    """Небольшой LRU полей пользователей в памяти процесса.
+
+    Запись живёт timeout секунд: изменения из других процессов видны не
+    позже этого срока, из своего — сразу (Users.save сбрасывает запись).
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires <= time.monotonic():
+                del self._entries[pk]
+                return None
+            self._entries.move_to_end(pk)
+            return values
+
+    def set(self, pk, values):
+        if not self.size or not self.timeout:
+            return
+        with self._lock:
+            self._entries[pk] = (time.monotonic() + self.timeout, values)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TIMEOUT)
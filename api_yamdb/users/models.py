@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
 
 from api_yamdb.settings import (
     MAX_EMAIL_LENGTH,
@@ -7,6 +7,7 @@ from api_yamdb.settings import (
     MAX_ROLE_LENGTH,
     MAX_USERS_NAME_LENGTH
 )
+from .cache import user_cache
 
 
 class Users(AbstractUser):
@@ -56,6 +57,17 @@ class Users(AbstractUser):
         max_length=MAX_PASSWORD_LENGTH
     )
 
+    token_version = models.PositiveIntegerField(
+        "Версия токенов",
+        default=0,
+        editable=False
+    )
+
+    # Поля, при смене которых выданные токены отзываются.
+    TOKEN_STATE_FIELDS = (
+        "username", "role", "is_staff", "is_superuser", "is_active",
+    )
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
@@ -75,3 +87,107 @@ class Users(AbstractUser):
     @property
     def is_user(self):
         return self.role == Users.USER
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_token_state()
+        return instance
+
+    @classmethod
+    def cached_values(cls, pk):
+        """Все поля пользователя из user_cache или одним запросом."""
+        values = user_cache.get(pk)
+        if values is None:
+            values = Users.objects.filter(pk=pk).values(
+                *(field.attname for field in cls._meta.concrete_fields)
+            ).first()
+            if values is not None:
+                user_cache.set(pk, values)
+        return values
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.remember_token_state(fields)
+
+    def remember_token_state(self, fields=None):
+        """Запомнить загруженные из БД значения полей из claims (все или
+        только fields)."""
+        state = getattr(self, "_token_state", None)
+        if state is None:
+            state = (None,) * len(self.TOKEN_STATE_FIELDS)
+        self._token_state = tuple(
+            self.__dict__.get(name)
+            if fields is None or name in fields else old
+            for name, old in zip(self.TOKEN_STATE_FIELDS, state)
+        )
+
+    def token_state_changed(self, fields=None):
+        """Изменились ли поля, попавшие в claims токенов, или только
+        fields из них (не загруженные из БД поля не в счёт)."""
+        state = getattr(self, "_token_state", None)
+        if self._state.adding or state is None:
+            return False
+        return any(
+            old is not None and self.__dict__.get(name, old) != old
+            for name, old in zip(self.TOKEN_STATE_FIELDS, state)
+            if fields is None or name in fields
+        )
+
+    def save(self, *args, **kwargs):
+        """Сохранить пользователя; смена роли, прав, имени или активности
+        поднимает token_version и отзывает выданные токены."""
+        if self.token_state_changed():
+            self.token_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "token_version"}
+        super().save(*args, **kwargs)
+        self.remember_token_state()
+        user_cache.discard(self.pk)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        user_cache.discard(pk)
+        return result
+
+
+class ClaimsUser(Users):
+    """Пользователь, собранный из claims access-токена.
+
+    pk, username, role, is_staff и is_superuser берутся из токена, так что
+    проверка прав обходится без БД. Остальные поля подгружаются все разом
+    при первом обращении — из user_cache или одним запросом.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        """Роль взята из токена, остальное — из кэша, и то и другое может
+        устареть: сохранять можно только Users, загруженного из БД."""
+        raise TypeError(
+            "ClaimsUser нельзя сохранить, загрузите Users из БД."
+        )
+
+    @classmethod
+    def from_values(cls, values):
+        fields = [
+            field.attname for field in cls._meta.concrete_fields
+            if field.attname in values
+        ]
+        return cls.from_db(
+            DEFAULT_DB_ALIAS, fields, [values[name] for name in fields]
+        )
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is None or not deferred.issuperset(fields):
+            return super().refresh_from_db(using=using, fields=fields)
+        values = self.cached_values(self.pk)
+        if values is None:
+            raise self.DoesNotExist
+        for name in deferred:
+            setattr(self, name, values[name])
+        self.remember_token_state(deferred)
@@ -1,9 +1,20 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """Пользователи из отката прошлого теста не должны остаться в LRU."""
+    from users.cache import user_cache
+
+    user_cache.clear()
+    yield
@@ -0,0 +1,333 @@
+import json
+import os
+import time
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.models import ResourceVersion
+from api.signals import MODEL_RESOURCES
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.leaderboard import rebuild_leaderboard
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.authentication import access_token_for
+from users.models import Users
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'perf_baseline.json')
+UPDATE_BASELINE = os.getenv('PERF_UPDATE_BASELINE') == '1'
+ITERATIONS = int(os.getenv('PERF_ITERATIONS', 15))
+LATENCY_TOLERANCE = float(os.getenv('PERF_LATENCY_TOLERANCE', 0.5))
+LATENCY_SLACK_MS = float(os.getenv('PERF_LATENCY_SLACK_MS', 5))
+DATASET_SIZES = (5, 40)
+LIST_LIMIT = 100
+
+
+class Case:
+    """Один вызов маршрута из api/urls.py с бюджетом запросов к БД.
+
+    Кеш ответов очищается перед каждым вызовом; cached=True измеряет,
+    наоборот, ответ из прогретого кеша.
+    """
+
+    def __init__(self, route, method, budget, kwargs=None, auth=None,
+                 data=None, query='', label='', cached=False):
+        self.route = route
+        self.method = method
+        self.budget = budget
+        self.kwargs = kwargs or {}
+        self.auth = auth
+        self.data = data
+        self.query = query
+        self.label = label
+        self.cached = cached
+
+    @property
+    def key(self):
+        return f'{self.method.upper()} {self.route}'
+
+    @property
+    def baseline_key(self):
+        """Ключ базовой линии: разные вызовы одного маршрута не смешиваются."""
+        return self.key + self.query + self.label + (
+            ' cached' if self.cached else ''
+        )
+
+    def __repr__(self):
+        return self.key
+
+
+CASES = (
+    Case('api-root', 'get', 0),
+    Case('titles-list', 'get', 4, query=f'?limit={LIST_LIMIT}'),
+    Case('titles-list', 'get', 1, query=f'?limit={LIST_LIMIT}', cached=True),
+    Case('titles-list', 'get', 3,
+         query=f'?limit={LIST_LIMIT}&pagination=cursor&ordering=-rating'),
+    Case('titles-list', 'get', 4,
+         query=f'?limit={LIST_LIMIT}&name=%D0%BF%D1%80%D0%BE%D0%B8%D0%B7'),
+    Case('titles-facets', 'get', 3),
+    Case('titles-facets', 'get', 3, query='?genre=genre-1'),
+    Case('titles-detail', 'get', 4, kwargs={'pk': 'title'}),
+    Case('titles-score-distribution', 'get', 2, kwargs={'pk': 'title'}),
+    Case('titles-top', 'get', 5, query=f'?limit={LIST_LIMIT}'),
+    Case('titles-top', 'get', 6, query='?category=category-0&offset=10'),
+    Case('titles-trending', 'get', 5, query='?window=7d'),
+    Case('titles-trending', 'get', 1, query='?window=7d', cached=True),
+    Case('titles-list', 'post', 9, auth='admin', data={
+        'name': 'Новое произведение', 'year': 2000,
+        'genre': ['genre-0', 'genre-1'], 'category': 'category-0',
+    }),
+    Case('titles-bulk', 'post', 9, auth='admin', data=[
+        {'name': f'Пакет {i}', 'year': 2000, 'genre': ['genre-0', 'genre-1'],
+         'category': 'category-0'}
+        for i in range(2)
+    ]),
+    Case('titles-detail', 'patch', 5, kwargs={'pk': 'title'}, auth='admin',
+         data={'name': 'Переименованное'}),
+    Case('genres-list', 'get', 3, query=f'?limit={LIST_LIMIT}'),
+    Case('genres-list', 'get', 3,
+         query=f'?limit={LIST_LIMIT}&search=%D0%96%D0%B0%D0%BD'),
+    Case('genres-list', 'post', 3, auth='admin',
+         data={'name': 'Новый жанр', 'slug': 'new-genre'}),
+    Case('genres-detail', 'delete', 5, kwargs={'slug': 'genre-4'},
+         auth='admin'),
+    Case('categories-list', 'get', 3, query=f'?limit={LIST_LIMIT}'),
+    Case('categories-detail', 'delete', 5, kwargs={'slug': 'category-2'},
+         auth='admin'),
+    Case('reviews-list', 'get', 5, kwargs={'title_id': 'title'},
+         query=f'?limit={LIST_LIMIT}'),
+    Case('reviews-list', 'post', 11, kwargs={'title_id': 'title'},
+         auth='newcomer', data={'text': 'Отзыв', 'score': 7}),
+    Case('reviews-detail', 'get', 3,
+         kwargs={'title_id': 'title', 'pk': 'review'}),
+    Case('reviews-detail', 'patch', 6,
+         kwargs={'title_id': 'title', 'pk': 'review'}, auth='author',
+         data={'score': 3}),
+    Case('comments-list', 'get', 5,
+         kwargs={'title_id': 'title', 'review_id': 'review'},
+         query=f'?limit={LIST_LIMIT}'),
+    Case('comments-list', 'post', 5,
+         kwargs={'title_id': 'title', 'review_id': 'review'},
+         auth='newcomer', data={'text': 'Комментарий'}),
+    Case('comments-detail', 'get', 3,
+         kwargs={'title_id': 'title', 'review_id': 'review',
+                 'pk': 'comment'}),
+    Case('users-list', 'get', 3, auth='admin', query=f'?limit={LIST_LIMIT}'),
+    Case('users-detail', 'get', 2, kwargs={'username': 'author'},
+         auth='admin'),
+    Case('users-me', 'get', 1, auth='author'),
+    Case('users-me', 'patch', 2, auth='author', data={'bio': 'Обо мне'}),
+    Case('user-reviews-list', 'get', 2, kwargs={'username': 'me'},
+         auth='author', query=f'?limit={LIST_LIMIT}'),
+    Case('user-comments-list', 'get', 3, kwargs={'username': 'author'},
+         auth='admin', query=f'?limit={LIST_LIMIT}'),
+    Case('register', 'post', 5,
+         data={'username': 'newbie', 'email': 'newbie@yamdb.fake'}),
+    Case('token', 'post', 1, data={'username': 'author'}),
+    Case('moderation', 'post', 18, kwargs={'resource': 'reviews'},
+         auth='admin', data={'author': 'user-1'}, label=' reviews'),
+    Case('moderation', 'post', 15, kwargs={'resource': 'comments'},
+         auth='admin', data={'author': 'user-1'}, label=' comments'),
+    Case('export', 'get', 3, kwargs={'resource': 'titles'}, auth='admin'),
+    Case('export', 'get', 2, kwargs={'resource': 'comments'}, auth='admin',
+         query='?as=csv'),
+    Case('outbox-metrics', 'get', 5, auth='admin'),
+)
+
+
+def _route_names(patterns, namespace=''):
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            nested = namespace
+            if pattern.namespace:
+                nested = f'{namespace}{pattern.namespace}:'
+            names |= _route_names(pattern.url_patterns, nested)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def seed_dataset(size):
+    """Каталог из size произведений с отзывами и комментариями.
+
+    Отзывов у произведения и комментариев у отзыва тем больше, чем больше
+    size, поэтому N+1 сразу выводит число запросов за бюджет.
+    """
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(5)
+    ]
+    Users.objects.bulk_create(
+        Users(username=f'user-{i}', email=f'user-{i}@yamdb.fake')
+        for i in range(size)
+    )
+    users = list(Users.objects.order_by('pk'))
+    admin = Users.objects.create(
+        username='admin', email='admin@yamdb.fake', role=Users.ADMIN
+    )
+    newcomer = Users.objects.create(
+        username='newcomer', email='newcomer@yamdb.fake'
+    )
+    titles = []
+    for i in range(size):
+        title = Title.objects.create(
+            name=f'Произведение {i}',
+            year=1950 + i,
+            category=categories[i % len(categories)],
+            description='Описание',
+        )
+        title.genre.set(genres[:1 + i % len(genres)])
+        titles.append(title)
+    title = titles[0]
+    for index, user in enumerate(users):
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=1 + index % 10
+        )
+        for commenter in users[:size]:
+            Comment.objects.create(
+                review=review, author=commenter, text='Комментарий'
+            )
+    review = title.reviews.order_by('pk').first()
+    rebuild_leaderboard()
+    ResourceVersion.objects.get_versions(
+        sorted({
+            'leaderboard',
+            *(name for names in MODEL_RESOURCES.values() for name in names),
+        })
+    )
+    return {
+        'title': title.pk,
+        'review': review.pk,
+        'comment': review.comments.order_by('pk').first().pk,
+        'author': review.author.username,
+        'users': {
+            'admin': admin,
+            'author': review.author,
+            'newcomer': newcomer,
+        },
+    }
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _call(client, case, dataset):
+    kwargs = {
+        name: dataset.get(value, value) for name, value in case.kwargs.items()
+    }
+    url = reverse(f'api:{case.route}', kwargs=kwargs) + case.query
+    data = case.data
+    if case.route == 'token':
+        user = dataset['users']['author']
+        data = {
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        }
+    client.credentials()
+    if case.auth:
+        token = access_token_for(dataset['users'][case.auth])
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return getattr(client, case.method)(url, data=data, format='json')
+
+
+def _measure(case, dataset):
+    """Число запросов и задержки маршрута; изменения данных откатываются."""
+    client = APIClient()
+    cache = caches[API_CACHE_ALIAS]
+    cache.clear()
+    if case.cached:
+        _call(client, case, dataset)
+    samples = []
+    queries = None
+    for _ in range(ITERATIONS + 1):
+        if not case.cached:
+            cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = _call(client, case, dataset)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        assert response.status_code < 400, (
+            f'{case.key}: {response.status_code} {response.content[:300]}'
+        )
+        if queries is None:
+            queries = len(context.captured_queries)
+            continue
+        samples.append(elapsed)
+    return {
+        'queries': queries,
+        'p50_ms': round(_percentile(samples, 50), 3),
+        'p95_ms': round(_percentile(samples, 95), 3),
+    }
+
+
+def _load_baseline():
+    try:
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_baseline(baseline):
+    with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+class TestApiBudgets:
+
+    def test_every_route_has_budget(self):
+        routes = _route_names(api_urls.urlpatterns)
+        covered = {case.route for case in CASES}
+        missing = routes - covered
+        assert not missing, (
+            f'Добавьте в CASES бюджет для маршрутов: {sorted(missing)}'
+        )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('size', DATASET_SIZES)
+    def test_query_and_latency_budgets(self, size):
+        dataset = seed_dataset(size)
+        baseline = _load_baseline()
+        vendor = baseline.setdefault(connection.vendor, {})
+        errors = []
+        for case in CASES:
+            result = _measure(case, dataset)
+            if result['queries'] > case.budget:
+                errors.append(
+                    f'{case.key}: {result["queries"]} запросов к БД '
+                    f'при бюджете {case.budget}'
+                )
+            recorded = vendor.setdefault(case.baseline_key, {})
+            previous = recorded.get(str(size))
+            if UPDATE_BASELINE:
+                recorded[str(size)] = result
+                continue
+            if previous is None:
+                continue
+            allowed = previous['p50_ms'] * (1 + LATENCY_TOLERANCE)
+            if result['p50_ms'] > allowed + LATENCY_SLACK_MS:
+                errors.append(
+                    f'{case.key}: медиана {result["p50_ms"]} мс, '
+                    f'в базовой линии {previous["p50_ms"]} мс'
+                )
+        if UPDATE_BASELINE:
+            _save_baseline(baseline)
+        assert not errors, '\n'.join(errors)
@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Category, Genre, GenreTitle, Title
+from users.models import Users
+
+
+@pytest.fixture
+def admin_client():
+    admin = Users.objects.create(
+        username='admin', email='admin@yamdb.fake', role=Users.ADMIN
+    )
+    client = APIClient()
+    token = AccessToken.for_user(admin)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkTitles:
+
+    def setup_method(self):
+        self.url = reverse('api:titles-bulk')
+
+    def test_create_with_partial_errors(self, admin_client):
+        Category.objects.create(name='Книги', slug='books')
+        Genre.objects.create(name='Драма', slug='drama')
+        Genre.objects.create(name='Комедия', slug='comedy')
+        items = [
+            {'name': f'Книга {i}', 'year': 2000, 'genre': ['drama', 'comedy'],
+             'category': 'books'}
+            for i in range(3)
+        ]
+        items.append({'name': 'Ошибка', 'year': 2000, 'genre': ['unknown'],
+                      'category': 'books'})
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [201] * 3 + [400]
+        assert results[0]['data']['genre'] == ['drama', 'comedy']
+        assert 'genre' in results[3]['errors']
+        assert Title.objects.count() == 3
+        assert GenreTitle.objects.count() == 6
+
+    def test_update(self, admin_client):
+        category = Category.objects.create(name='Книги', slug='books')
+        Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        response = admin_client.patch(self.url, [
+            {'id': title.pk, 'name': 'Новая книга', 'genre': ['drama']},
+            {'name': 'Без id'},
+        ], format='json')
+        assert response.status_code == 207
+        title.refresh_from_db()
+        assert title.name == 'Новая книга'
+        assert list(title.genre.values_list('slug', flat=True)) == ['drama']
+        assert 'id' in response.json()[1]['errors']
+
+    def test_requires_list_and_admin(self, admin_client):
+        assert admin_client.post(
+            self.url, {'name': 'Книга'}, format='json'
+        ).status_code == 400
+        assert APIClient().post(self.url, [], format='json').status_code == 401
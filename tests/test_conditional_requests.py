@@ -0,0 +1,92 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Comment, Review
+
+from .test_api_budgets import seed_dataset
+
+
+def _client(user=None):
+    client = APIClient()
+    if user is not None:
+        token = AccessToken.for_user(user)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalRequests:
+
+    def test_not_modified(self):
+        dataset = seed_dataset(3)
+        client = _client(dataset['users']['admin'])
+        urls = (
+            reverse('api:titles-detail', kwargs={'pk': dataset['title']}),
+            reverse('api:reviews-list', kwargs={'title_id': dataset['title']}),
+        )
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response['ETag']
+            assert response['Last-Modified']
+            repeated = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            assert repeated.status_code == 304, url
+            assert repeated['ETag'] == response['ETag']
+
+    def test_etag_changes_with_comments(self):
+        dataset = seed_dataset(3)
+        client = _client(dataset['users']['admin'])
+        url = reverse(
+            'api:reviews-list', kwargs={'title_id': dataset['title']}
+        )
+        etag = client.get(url)['ETag']
+        Comment.objects.create(
+            review_id=dataset['review'],
+            author=dataset['users']['newcomer'],
+            text='Новый комментарий',
+        )
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_if_match_prevents_lost_update(self):
+        dataset = seed_dataset(3)
+        client = _client(dataset['users']['admin'])
+        url = reverse('api:titles-detail', kwargs={'pk': dataset['title']})
+        etag = client.get(url)['ETag']
+        first = client.patch(
+            url, {'name': 'Первая правка'}, format='json', HTTP_IF_MATCH=etag
+        )
+        assert first.status_code == 200
+        second = client.patch(
+            url, {'name': 'Вторая правка'}, format='json', HTTP_IF_MATCH=etag
+        )
+        assert second.status_code == 412
+
+    def test_detail_if_match_ignores_other_writes(self):
+        dataset = seed_dataset(3)
+        client = _client(dataset['users']['admin'])
+        kwargs = {'title_id': dataset['title'], 'pk': dataset['review']}
+        review_url = reverse('api:reviews-detail', kwargs=kwargs)
+        comment_url = reverse('api:comments-detail', kwargs={
+            'title_id': dataset['title'],
+            'review_id': dataset['review'],
+            'pk': dataset['comment'],
+        })
+        review_etag = client.get(review_url)['ETag']
+        comment_etag = client.get(comment_url)['ETag']
+        newcomer = dataset['users']['newcomer']
+        other = Review.objects.create(
+            title_id=dataset['title'], author=newcomer, text='Чужой', score=3
+        )
+        Comment.objects.create(review=other, author=newcomer, text='Чужой')
+        for url, etag in ((review_url, review_etag),
+                          (comment_url, comment_etag)):
+            first = client.patch(
+                url, {'text': 'Правка'}, format='json', HTTP_IF_MATCH=etag
+            )
+            assert first.status_code == 200, url
+            second = client.patch(
+                url, {'text': 'Ещё'}, format='json', HTTP_IF_MATCH=etag
+            )
+            assert second.status_code == 412, url
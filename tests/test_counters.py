@@ -0,0 +1,76 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Comment, Review, Title
+from users.models import Users
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCounters:
+
+    def setup_method(self):
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(3)
+        ]
+        self.reviews = [
+            Review.objects.create(
+                title=self.title, author=user, text='Отзыв', score=5
+            )
+            for user in self.users[:2]
+        ]
+
+    def _comment(self, review, user):
+        return Comment.objects.create(review=review, author=user, text='Ок')
+
+    def _counts(self):
+        return [
+            review.comments_count
+            for review in Review.objects.order_by('pk')
+        ]
+
+    def test_comments_count(self):
+        first, second = self.reviews
+        comment = self._comment(first, self.users[0])
+        self._comment(first, self.users[1])
+        assert self._counts() == [2, 0]
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.review = second
+        comment.save()
+        assert self._counts() == [1, 1]
+        comment.delete()
+        assert self._counts() == [1, 0]
+
+    def test_review_save_keeps_comments_count(self):
+        review = Review.objects.get(pk=self.reviews[0].pk)
+        self._comment(review, self.users[2])
+        review.text = 'Исправленный отзыв'
+        review.save()
+        assert self._counts() == [1, 0]
+
+    def test_api_exposes_counters(self):
+        self._comment(self.reviews[0], self.users[2])
+        client = APIClient()
+        title = client.get(
+            reverse('api:titles-detail', kwargs={'pk': self.title.pk})
+        ).json()
+        assert title['reviews_count'] == 2
+        url = reverse('api:reviews-list', kwargs={'title_id': self.title.pk})
+        reviews = client.get(url).json()['results']
+        assert [review['comments_count'] for review in reviews] == [1, 0]
+        self._comment(self.reviews[1], self.users[2])
+        reviews = client.get(url).json()['results']
+        assert [review['comments_count'] for review in reviews] == [1, 1]
+
+    def test_rebuild_aggregates(self):
+        self._comment(self.reviews[0], self.users[2])
+        Review.objects.update(comments_count=7)
+        with pytest.raises(CommandError, match='Счётчик комментариев'):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        assert self._counts() == [1, 0]
+        call_command('rebuild_aggregates', '--check')
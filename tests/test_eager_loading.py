@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import serializers
+from api.mixins import build_eager_loading_plan
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import Users
+
+PLANS = (
+    ('GenreSerializer', [], []),
+    ('CategorySerializer', [], []),
+    ('UsersSerializer', [], []),
+    ('TitleSerializer', ['category'], ['genre']),
+    ('TitleGetSerializer', ['category'], ['genre']),
+    ('ReviewSerializer', ['author'], []),
+    ('CommentSerializer', ['author'], []),
+    ('UserReviewSerializer', ['author'], []),
+    ('UserCommentSerializer', ['author', 'review'], []),
+)
+
+
+def _plan(name):
+    serializer_class = getattr(serializers, name)
+    return serializer_class, build_eager_loading_plan(
+        serializer_class().fields, serializer_class.Meta.model
+    )
+
+
+@pytest.mark.parametrize('name, select_related, prefetch_related', PLANS)
+def test_plan(name, select_related, prefetch_related):
+    _, plan = _plan(name)
+    assert sorted(plan.select_related) == select_related
+    assert [
+        lookup.prefetch_through for lookup in plan.prefetch_related
+    ] == prefetch_related
+    assert plan.complete
+
+
+def test_foreign_key_attname_stops_at_relation():
+    _, plan = _plan('UserCommentSerializer')
+    assert {'review', 'review__title'} <= plan.only
+    assert not any(name.endswith('_id') for name in plan.only)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', [name for name, _, _ in PLANS])
+def test_plan_serializes_without_extra_queries(name):
+    category = Category.objects.create(name='Категория', slug='category')
+    genre = Genre.objects.create(name='Жанр', slug='genre')
+    title = Title.objects.create(
+        name='Произведение', year=2000, category=category
+    )
+    title.genre.set([genre])
+    author = Users.objects.create(username='author', email='a@yamdb.fake')
+    review = Review.objects.create(
+        title=title, author=author, text='Отзыв', score=5
+    )
+    Comment.objects.create(review=review, author=author, text='Комментарий')
+    serializer_class, plan = _plan(name)
+    queryset = plan.apply(serializer_class.Meta.model.objects.all())
+    with CaptureQueriesContext(connection) as context:
+        data = serializer_class(queryset, many=True).data
+    assert len(data) == 1
+    assert len(context.captured_queries) == 1 + len(plan.prefetch_related)
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.export import export_rows
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import Users
+
+
+def _seed():
+    category = Category.objects.create(name='Книги', slug='books')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    for i in range(5):
+        title = Title.objects.create(name=f'Книга {i}', year=2000 + i,
+                                     category=category)
+        title.genre.set([drama, comedy][:i % 3])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestExport:
+
+    def test_rows_do_not_depend_on_chunk_size(self):
+        _seed()
+        rows = list(export_rows('titles'))
+        assert list(export_rows('titles', chunk_size=2)) == rows
+        assert [row['name'] for row in rows] == [
+            f'Книга {i}' for i in range(5)
+        ]
+        assert list(export_rows('genre_title', chunk_size=2)) == list(
+            export_rows('genre_title')
+        )
+
+    def test_endpoint(self):
+        _seed()
+        admin = Users.objects.create(
+            username='admin', email='admin@yamdb.fake', role=Users.ADMIN
+        )
+        client = APIClient()
+        token = AccessToken.for_user(admin)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = reverse('api:export', kwargs={'resource': 'titles'})
+
+        response = client.get(url)
+        assert response.status_code == 200
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['name'] for line in lines] == [
+            f'Книга {i}' for i in range(5)
+        ]
+
+        response = client.get(url, {'as': 'csv'}, HTTP_ACCEPT='text/csv')
+        assert response['Content-Type'].startswith('text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert list(rows[0]) == ['id', 'name', 'year', 'description',
+                                 'category_id']
+        response = client.get(
+            reverse('api:export', kwargs={'resource': 'genre_title'}),
+            {'as': 'csv'}, HTTP_ACCEPT='text/csv'
+        )
+        content = b''.join(response.streaming_content).decode()
+        assert len(list(csv.DictReader(io.StringIO(content)))) == 4
+        assert APIClient().get(url).status_code == 401
+
+    def test_command(self, tmp_path):
+        _seed()
+        output = tmp_path / 'titles.csv'
+        call_command('export_data', 'titles', '--as', 'csv', '-o', output)
+        header = output.read_text(encoding='utf-8').splitlines()[0]
+        assert header == 'id,name,year,description,category_id'
+
+    def test_reload_with_load_csv(self, tmp_path):
+        _seed()
+        author = Users.objects.create(username='author', email='a@yamdb.fake')
+        title = Title.objects.get(name='Книга 2')
+        review = Review.objects.create(
+            title=title, author=author, text='Отзыв', score=7
+        )
+        Comment.objects.create(review=review, author=author, text='Ответ')
+        files = {
+            'titles': 'titles.csv',
+            'genre_title': 'genre_title.csv',
+            'reviews': 'review.csv',
+            'comments': 'comments.csv',
+        }
+        exported = {}
+        for resource, name in files.items():
+            exported[resource] = list(export_rows(resource))
+            call_command(
+                'export_data', resource, '--as', 'csv',
+                '-o', tmp_path / name
+            )
+        call_command(
+            'load_csv', '--clear', '--path', str(tmp_path),
+            '--only', *files.values(), stdout=io.StringIO()
+        )
+        for resource in files:
+            assert list(export_rows(resource)) == exported[resource]
+        assert sorted(
+            Title.objects.get(pk=title.pk).genre.values_list('slug', flat=True)
+        ) == ['comedy', 'drama']
+        assert Title.objects.get(pk=title.pk).rating == 7
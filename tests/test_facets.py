@@ -0,0 +1,57 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Review, Title
+from users.models import Users
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFacets:
+
+    def test_facet_counts(self):
+        books = Category.objects.create(name='Книги', slug='books')
+        films = Category.objects.create(name='Фильмы', slug='films')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        first = Title.objects.create(name='Первое', year=1965,
+                                     category=books)
+        first.genre.set([drama, comedy])
+        second = Title.objects.create(name='Второе', year=1969,
+                                      category=films)
+        second.genre.set([drama])
+        Title.objects.create(name='Третье', year=2001, category=films)
+        author = Users.objects.create(username='author', email='a@yamdb.fake')
+        Review.objects.create(title=first, author=author, text='.', score=8)
+
+        url = reverse('api:titles-facets')
+        data = APIClient().get(url).json()
+        assert data['count'] == 3
+        assert data['genre'] == [
+            {'slug': 'comedy', 'name': 'Комедия', 'count': 1},
+            {'slug': 'drama', 'name': 'Драма', 'count': 2},
+        ]
+        assert data['category'] == [
+            {'slug': 'books', 'name': 'Книги', 'count': 1},
+            {'slug': 'films', 'name': 'Фильмы', 'count': 2},
+        ]
+        assert data['year'] == [
+            {'from': 1960, 'to': 1969, 'count': 2},
+            {'from': 2000, 'to': 2009, 'count': 1},
+        ]
+        assert data['rating'] == [
+            {'rating': 8, 'count': 1}, {'rating': None, 'count': 2},
+        ]
+
+        filtered = APIClient().get(url, {'genre': 'drama'}).json()
+        assert filtered['count'] == 2
+        assert filtered['category'] == [
+            {'slug': 'books', 'name': 'Книги', 'count': 1},
+            {'slug': 'films', 'name': 'Фильмы', 'count': 1},
+        ]
+
+    def test_invalid_filter(self):
+        response = APIClient().get(
+            reverse('api:titles-facets'), {'year': 'abc'}
+        )
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+import base64
+import json
+
+import pytest
+from django.core.cache import caches
+from django.db.models import Min
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.models import Category, Genre, Review, Title
+from users.models import Users
+
+PAGE = 2
+
+
+def _ids(response):
+    assert response.status_code == 200, response.content
+    return [item['id'] for item in response.json()['results']]
+
+
+def _walk(query):
+    """Все страницы вперёд по next, затем назад по previous."""
+    client = APIClient()
+    url = reverse('api:titles-list') + f'?limit={PAGE}&{query}'
+    forward, pages = [], []
+    while url:
+        response = client.get(url)
+        page = _ids(response)
+        assert 0 < len(page) <= PAGE
+        pages.append(page)
+        forward.extend(page)
+        last = response.json()
+        url = last['next']
+    backward = [pages[-1]]
+    url = last['previous']
+    while url:
+        response = client.get(url)
+        backward.append(_ids(response))
+        url = response.json()['previous']
+    assert backward == pages[::-1]
+    return forward
+
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(
+        json.dumps(payload).encode('utf-8')
+    ).decode('ascii')
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        categories = [
+            Category.objects.create(name=f'Категория {i}', slug=f'c-{i}')
+            for i in range(2)
+        ]
+        genres = [
+            Genre.objects.create(name=f'Жанр {i}', slug=f'g-{i}')
+            for i in range(3)
+        ]
+        users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(2)
+        ]
+        scores = [(8,), (), (5, 5), (8,), (), (2, 9), (10,)]
+        for index, title_scores in enumerate(scores):
+            title = Title.objects.create(
+                name=f'Произведение {index}',
+                year=2000 + index % 3,
+                category=(
+                    categories[index % 2] if index % 3 else None
+                ),
+            )
+            title.genre.set(genres[index % 3:index % 3 + index % 2 + 1])
+            for user, score in zip(users, title_scores):
+                Review.objects.create(
+                    title=title, author=user, text='Отзыв', score=score
+                )
+        Title.objects.create(name='Без жанра', year=2001)
+
+    def _expected(self, *ordering, annotate=None):
+        queryset = Title.objects.all()
+        if annotate:
+            queryset = queryset.annotate(**annotate)
+        return list(queryset.order_by(*ordering).values_list('pk', flat=True))
+
+    def test_all_pages_without_gaps(self):
+        assert _walk('pagination=cursor') == self._expected('pk')
+        assert _walk('pagination=cursor&ordering=-year') == self._expected(
+            '-year', 'pk'
+        )
+
+    def test_null_rating_both_directions(self):
+        assert Title.objects.filter(rating=None).count() == 3
+        assert _walk('pagination=cursor&ordering=rating') == (
+            self._expected('rating', 'pk')
+        )
+        assert _walk('pagination=cursor&ordering=-rating') == (
+            self._expected('-rating', 'pk')
+        )
+
+    def test_related_orderings(self):
+        assert _walk('pagination=cursor&ordering=category') == (
+            self._expected('category_id', 'pk')
+        )
+        for ordering in ('genre', '-genre'):
+            assert _walk(f'pagination=cursor&ordering={ordering}') == (
+                self._expected(
+                    ordering.replace('genre', 'first_genre'), 'pk',
+                    annotate={'first_genre': Min('genre')}
+                )
+            )
+
+    def test_bad_cursor(self):
+        client = APIClient()
+        url = reverse('api:titles-list') + '?cursor='
+        for cursor in (
+            'не-base64',
+            base64.urlsafe_b64encode(b'not json').decode('ascii'),
+            _cursor({'v': [1, 2, 3]}),
+            _cursor({'values': [1]}),
+            _cursor([1]),
+            _cursor({'v': ['abc']}),
+            _cursor({'v': [{'a': 1}]}),
+            _cursor({'v': [[1]]}),
+        ):
+            assert client.get(url + cursor).status_code == 404, cursor
+        title = Title.objects.filter(reviews__isnull=False).first()
+        url = reverse(
+            'api:reviews-list', kwargs={'title_id': title.pk}
+        ) + '?cursor='
+        for values in (['x', 1], [{'a': 1}, 1], ['2020-01-01', 'x']):
+            cursor = _cursor({'v': values})
+            assert client.get(url + cursor).status_code == 404, values
+        response = client.get(url + _cursor({'v': ['2000-01-01T00:00:00Z', 0]}))
+        assert len(_ids(response)) == title.reviews.count()
+
+    def test_limit_offset_by_default(self):
+        data = APIClient().get(
+            reverse('api:titles-list') + f'?limit={PAGE}&ordering=year'
+        ).json()
+        assert list(data) == ['count', 'next', 'previous', 'results']
+        assert data['count'] == Title.objects.count()
+        assert 'offset=2' in data['next']
+        assert data['previous'] is None
+        assert [item['id'] for item in data['results']] == (
+            self._expected('year', 'pk')[:PAGE]
+        )
@@ -0,0 +1,156 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews import leaderboard
+from reviews.leaderboard import leaderboard_is_stale, rebuild_leaderboard
+from reviews.models import Category, Genre, Review, Title, TitleRank
+from users.models import Users
+
+
+def _top(query=''):
+    response = APIClient().get(reverse('api:titles-top') + query)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def _names(data):
+    return [item['title']['name'] for item in data['results']]
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.books = Category.objects.create(name='Книги', slug='books')
+        self.drama = Genre.objects.create(name='Драма', slug='drama')
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(30)
+        ]
+        self.lucky = self._title('Одна десятка', [10])
+        self.solid = self._title('Много девяток', [9] * 30, self.books)
+        self.weak = self._title('Середнячок', [5] * 10, self.books)
+        self.solid.genre.add(self.drama)
+        self.unrated = Title.objects.create(name='Без отзывов', year=2000)
+
+    def _title(self, name, scores, category=None):
+        title = Title.objects.create(name=name, year=2000, category=category)
+        for user, score in zip(self.users, scores):
+            Review.objects.create(
+                title=title, author=user, text='Отзыв', score=score
+            )
+        return title
+
+    def test_bayesian_ranking(self):
+        assert rebuild_leaderboard() == 6
+        data = _top()
+        assert data['count'] == 3
+        assert _names(data) == [
+            'Много девяток', 'Одна десятка', 'Середнячок'
+        ]
+        first = data['results'][0]
+        assert first['position'] == 1
+        assert first['title']['rating'] == 9
+        assert 8 < first['score'] < 9
+        assert _names(_top('?category=books')) == [
+            'Много девяток', 'Середнячок'
+        ]
+        assert _names(_top('?genre=drama')) == ['Много девяток']
+
+    def test_pages(self):
+        rebuild_leaderboard()
+        data = _top('?limit=2')
+        assert _names(data) == ['Много девяток', 'Одна десятка']
+        assert data['next'] is not None
+        data = APIClient().get(data['next']).json()
+        assert _names(data) == ['Середнячок']
+        assert data['next'] is None
+
+    def test_size_limit(self):
+        with mock.patch.object(leaderboard, 'LEADERBOARD_SIZE', 1):
+            assert rebuild_leaderboard() == 3
+        assert _names(_top()) == ['Много девяток']
+
+    def test_bad_scope(self):
+        client = APIClient()
+        url = reverse('api:titles-top')
+        assert client.get(url + '?genre=nope').status_code == 404
+        response = client.get(url + '?genre=drama&category=books')
+        assert response.status_code == 400
+
+    def test_command_if_stale(self):
+        assert leaderboard_is_stale()
+        call_command('rebuild_leaderboard', '--if-stale')
+        assert not leaderboard_is_stale()
+        built_at = TitleRank.objects.values_list(
+            'built_at', flat=True
+        ).first()
+        call_command('rebuild_leaderboard', '--if-stale')
+        assert TitleRank.objects.values_list(
+            'built_at', flat=True
+        ).first() == built_at
+        Review.objects.create(
+            title=self.unrated, author=self.users[0], text='Отзыв', score=8
+        )
+        assert leaderboard_is_stale()
+
+
+@pytest.mark.django_db
+class TestLeaderboardRefresh:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.other = Title.objects.create(name='Другое', year=2000)
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(2)
+        ]
+
+    def _review(self, title, user, score=8):
+        return Review.objects.create(
+            title=title, author=user, text='Отзыв', score=score
+        )
+
+    def test_writes_only_mark_stale(self):
+        self._review(self.title, self.users[0])
+        assert not TitleRank.objects.exists()
+        assert leaderboard_is_stale()
+        rebuild_leaderboard()
+        assert not leaderboard_is_stale()
+        self._review(self.other, self.users[1], score=2)
+        assert _names(_top()) == ['Произведение']
+        assert leaderboard_is_stale()
+
+    def test_deleted_title_marks_stale(self):
+        self._review(self.title, self.users[0])
+        self._review(self.other, self.users[1], score=2)
+        third = Title.objects.create(name='Третье', year=2000)
+        self._review(third, self.users[0], score=1)
+        rebuild_leaderboard()
+        self.other.delete()
+        assert leaderboard_is_stale()
+        with mock.patch.object(leaderboard, 'LEADERBOARD_SIZE', 1):
+            rebuild_leaderboard()
+            assert not leaderboard_is_stale()
+            self.title.delete()
+            assert leaderboard_is_stale()
+
+    def test_watch(self):
+        self._review(self.title, self.users[0])
+        with mock.patch(
+            'reviews.management.commands.rebuild_leaderboard.time.sleep',
+            side_effect=[None, KeyboardInterrupt],
+        ):
+            call_command('rebuild_leaderboard', '--watch', '--interval', '0')
+        assert _names(_top()) == ['Произведение']
+        assert not leaderboard_is_stale()
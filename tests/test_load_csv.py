@@ -0,0 +1,66 @@
+import pytest
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+
+from reviews.models import (
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+    TitleRank,
+    TitleScore
+)
+from users.models import Users
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadCsv:
+
+    def test_load_static_data(self):
+        call_command('load_csv', '--batch-size', '10', '--defer-checks')
+        assert Users.objects.count() == 5
+        assert Title.objects.count() == 32
+        assert GenreTitle.objects.count() == 42
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.isoformat().startswith('2019-09-24T21:08:21')
+        assert not Title.objects.with_rating_drift().exists()
+        assert Title.objects.get(pk=1).rating_count == (
+            Review.objects.filter(title_id=1).count()
+        )
+
+    def test_reload_with_clear(self):
+        call_command('load_csv', '--only', 'category.csv', 'genre.csv')
+        call_command('load_csv', '--only', 'genre.csv', '--clear')
+        assert Genre.objects.count() == 15
+
+    def test_clear_skips_per_row_deletes(self):
+        call_command('load_csv')
+        deleted = []
+
+        def receiver(sender, **kwargs):
+            deleted.append(sender)
+
+        post_delete.connect(receiver)
+        try:
+            call_command('load_csv', '--only', 'titles.csv', '--clear')
+        finally:
+            post_delete.disconnect(receiver)
+        assert deleted == []
+        assert Title.objects.count() == 32
+        assert not Review.objects.exists()
+        assert not GenreTitle.objects.exists()
+        assert not TitleScore.objects.exists()
+        assert not TitleRank.objects.exists()
+        assert not Title.objects.filter(rating_count__gt=0).exists()
+        assert Genre.objects.count() == 15
+
+    def test_leaderboard_rebuilt(self):
+        call_command('load_csv', '--only', 'category.csv', 'genre.csv')
+        assert not TitleRank.objects.exists()
+        call_command('load_csv', '--clear')
+        assert TitleRank.objects.filter(
+            scope=TitleRank.ALL, position=1
+        ).exists()
@@ -0,0 +1,119 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.moderation import delete_in_batches, moderation_queryset
+from reviews.models import Comment, Review, Title, TitleScore
+from users.models import Users
+
+
+def _url(resource):
+    return reverse('api:moderation', kwargs={'resource': resource})
+
+
+@pytest.mark.django_db(transaction=True)
+class TestModeration:
+
+    def setup_method(self):
+        self.titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000)
+            for i in range(3)
+        ]
+        self.spammer = Users.objects.create(
+            username='spammer', email='spammer@yamdb.fake'
+        )
+        self.readers = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(3)
+        ]
+        for index, title in enumerate(self.titles):
+            Review.objects.create(
+                title=title, author=self.spammer, text='Спам', score=1
+            )
+            for reader in self.readers[:index + 1]:
+                review = Review.objects.create(
+                    title=title, author=reader, text='Отзыв', score=8
+                )
+                Comment.objects.create(
+                    review=review, author=self.spammer, text='Спам'
+                )
+                Comment.objects.create(
+                    review=review, author=reader, text='Ок'
+                )
+        self.moderator = Users.objects.create(
+            username='moderator', email='moderator@yamdb.fake',
+            role=Users.MODERATOR
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.moderator)
+
+    def test_permissions_and_validation(self):
+        client = APIClient()
+        client.force_authenticate(self.readers[0])
+        assert client.post(
+            _url('reviews'), {'author': 'spammer'}, format='json'
+        ).status_code == 403
+        assert self.client.post(
+            _url('reviews'), {}, format='json'
+        ).status_code == 400
+        assert self.client.post(
+            _url('titles'), {'author': 'spammer'}, format='json'
+        ).status_code == 404
+
+    def test_dry_run(self):
+        response = self.client.post(
+            _url('comments'), {'author': 'spammer', 'dry_run': True},
+            format='json'
+        )
+        assert response.json() == {'matched': 6}
+        assert Comment.objects.count() == 12
+
+    def test_delete_reviews_keeps_aggregates(self):
+        response = self.client.post(
+            _url('reviews'), {'author': 'spammer'}, format='json'
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            'deleted': {'reviews': 3}, 'batches': 1, 'titles': 3,
+        }
+        for title in Title.objects.all():
+            assert (title.rating, title.rating_count) == (
+                8, title.reviews.count()
+            )
+        assert not TitleScore.objects.filter(score=1, count__gt=0).exists()
+        call_command('rebuild_aggregates', '--check')
+
+    def test_delete_comments_in_batches(self):
+        queryset = moderation_queryset(
+            'comments', {'author': 'spammer', 'title': self.titles[2].pk}
+        )
+        summary = delete_in_batches(queryset, batch_size=2)
+        assert summary == {
+            'deleted': {'comments': 3}, 'batches': 2, 'titles': 1,
+        }
+        assert set(self.titles[2].reviews.exclude(
+            author=self.spammer
+        ).values_list('comments_count', flat=True)) == {1}
+        call_command('rebuild_aggregates', '--check')
+
+    def test_recalculates_once_per_batch(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(
+                _url('reviews'), {'ids': list(
+                    Review.objects.values_list('pk', flat=True)
+                )}, format='json'
+            )
+        rating_updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+            and 'rating_sum' in query['sql']
+        ]
+        assert len(rating_updates) == 1
+        assert not Review.objects.exists() and not Comment.objects.exists()
+        assert set(Title.objects.values_list('rating_count', flat=True)) == {
+            0
+        }
+        call_command('rebuild_aggregates', '--check')
@@ -0,0 +1,73 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.models import Comment, Review, Title
+from users.models import Users
+
+
+def _review_selects(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "reviews_review"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNestedParents:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.other = Title.objects.create(name='Другое', year=2001)
+        self.user = Users.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        self.review = Review.objects.create(
+            title=self.title, author=self.user, text='Отзыв', score=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _url(self, title, review=None):
+        return reverse('api:comments-list', kwargs={
+            'title_id': title.pk, 'review_id': (review or self.review).pk
+        })
+
+    def test_review_must_belong_to_title(self):
+        url = self._url(self.other)
+        assert self.client.get(url).status_code == 404
+        assert self.client.post(url, {'text': 'Ок'}).status_code == 404
+        assert not Comment.objects.exists()
+        comment = Comment.objects.create(
+            review=self.review, author=self.user, text='Ок'
+        )
+        response = self.client.get(reverse('api:comments-detail', kwargs={
+            'title_id': self.other.pk, 'review_id': self.review.pk,
+            'pk': comment.pk,
+        }))
+        assert response.status_code == 404
+
+    def test_parent_loaded_once(self):
+        url = self._url(self.title)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, {'text': 'Ок'})
+        assert response.status_code == 201
+        assert len(_review_selects(context)) == 1
+        assert 'JOIN "reviews_title"' in _review_selects(context)[0]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        assert response.status_code == 200
+        assert len(_review_selects(context)) == 1
+
+    def test_cache_follows_deletion(self):
+        url = self._url(self.title)
+        assert self.client.get(url).status_code == 200
+        self.review.delete()
+        assert self.client.get(url).status_code == 404
+        assert self.client.post(url, {'text': 'Ок'}).status_code == 404
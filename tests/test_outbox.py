@@ -0,0 +1,193 @@
+import datetime
+import json
+import threading
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import OutboxEmail
+from api.outbox import (
+    OutboxWorker,
+    deliver,
+    outbox_metrics,
+    retry_delay,
+    send_batch
+)
+from api_yamdb.settings import OUTBOX_MAX_ATTEMPTS
+from users.models import Users
+
+
+def _enqueue(count):
+    return [
+        OutboxEmail.objects.enqueue(to=f'{i}@yamdb.fake', body=f'Код {i}')
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestOutbox:
+
+    def test_signup_enqueues_without_sending(self):
+        response = APIClient().post(
+            reverse('api:register'),
+            {'username': 'newbie', 'email': 'newbie@yamdb.fake'},
+        )
+        assert response.status_code == 200, response.content
+        assert mail.outbox == []
+        email = OutboxEmail.objects.get()
+        assert email.to == 'newbie@yamdb.fake'
+        assert email.body.startswith('newbie, ')
+        assert email.status == OutboxEmail.PENDING
+
+    def test_batch_uses_one_connection(self):
+        _enqueue(3)
+        with mock.patch.object(
+            EmailBackend, 'open', autospec=True, return_value=True
+        ) as opened:
+            assert send_batch(batch_size=2) == (2, 0)
+        assert opened.call_count == 1
+        assert send_batch(batch_size=2) == (1, 0)
+        assert send_batch() == (0, 0)
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            '0@yamdb.fake', '1@yamdb.fake', '2@yamdb.fake'
+        ]
+        assert not OutboxEmail.objects.exclude(
+            status=OutboxEmail.SENT
+        ).exists()
+        assert not OutboxEmail.objects.filter(sent_at=None).exists()
+
+    def test_failures_retry_then_dead(self):
+        email, = _enqueue(1)
+        with mock.patch.object(
+            EmailBackend, 'send_messages', side_effect=OSError('нет связи')
+        ):
+            assert send_batch() == (0, 1)
+            email.refresh_from_db()
+            assert email.status == OutboxEmail.PENDING
+            assert email.attempts == 1
+            assert email.last_error == 'OSError: нет связи'
+            assert email.next_attempt_at > timezone.now()
+            assert send_batch() == (0, 0)
+            for _ in range(2, OUTBOX_MAX_ATTEMPTS + 1):
+                OutboxEmail.objects.update(next_attempt_at=timezone.now())
+                assert send_batch() == (0, 1)
+        email.refresh_from_db()
+        assert email.attempts == OUTBOX_MAX_ATTEMPTS
+        assert email.status == OutboxEmail.DEAD
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        assert send_batch() == (0, 0)
+        assert mail.outbox == []
+        assert retry_delay(3) == 4 * retry_delay(1)
+
+    def test_claim_leases_rows(self):
+        _enqueue(2)
+        claimed = OutboxEmail.objects.claim(1)
+        assert len(claimed) == 1
+        rest = OutboxEmail.objects.claim(10)
+        assert len(rest) == 1 and rest[0].pk != claimed[0].pk
+        assert OutboxEmail.objects.claim(10) == []
+        later = timezone.now() + datetime.timedelta(hours=1)
+        assert len(OutboxEmail.objects.claim(10, now=later)) == 2
+
+    def test_metrics(self):
+        _enqueue(3)
+        OutboxEmail.objects.filter(to='2@yamdb.fake').update(
+            next_attempt_at=timezone.now() + datetime.timedelta(hours=1)
+        )
+        metrics = outbox_metrics()
+        assert metrics['pending'] == 3
+        assert metrics['due'] == 2
+        assert metrics['dead'] == 0
+        assert metrics['oldest_pending_age'] >= 0
+        assert metrics['send_latency']['p50'] is None
+        send_batch()
+        metrics = outbox_metrics()
+        assert metrics['pending'] == 1
+        assert metrics['due'] == 0
+        assert metrics['send_latency']['max'] >= 0
+
+    def test_metrics_endpoint(self):
+        url = reverse('api:outbox-metrics')
+        client = APIClient()
+        assert client.get(url).status_code == 401
+        client.force_authenticate(Users.objects.create(
+            username='user', email='user@yamdb.fake'
+        ))
+        assert client.get(url).status_code == 403
+        client.force_authenticate(Users.objects.create(
+            username='admin', email='admin@yamdb.fake', role='admin'
+        ))
+        _enqueue(1)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()['pending'] == 1
+
+    def test_slow_batch_skips_taken_over_emails(self):
+        _enqueue(2)
+        first, second = OutboxEmail.objects.claim(10)
+        expired = timezone.now() - datetime.timedelta(seconds=1)
+        OutboxEmail.objects.update(next_attempt_at=expired)
+        first.next_attempt_at = second.next_attempt_at = expired
+        taken, = OutboxEmail.objects.claim(1)
+        assert taken.pk == first.pk
+        sent, failed = deliver([first, second])
+        assert sent == [second.pk] and failed == []
+        assert [message.to for message in mail.outbox] == [[second.to]]
+        second.refresh_from_db()
+        assert second.next_attempt_at > timezone.now()
+
+    def test_worker_survives_batch_errors(self):
+        stop = threading.Event()
+        worker = OutboxWorker(stop, 0, once=True)
+        with mock.patch(
+            'api.outbox.send_batch',
+            side_effect=[
+                OperationalError('database table is locked'),
+                (1, 0),
+                (0, 0),
+            ],
+        ):
+            worker.run()
+        assert (worker.sent, worker.errors, worker.error) == (1, 1, None)
+
+    def test_command_reports_broken_workers(self):
+        _enqueue(1)
+        with mock.patch(
+            'api.outbox.send_batch',
+            side_effect=OperationalError('database table is locked'),
+        ):
+            with pytest.raises(CommandError, match='ошибок воркеров: 5'):
+                call_command(
+                    'send_outbox', '--once', '--interval', '0',
+                    stdout=StringIO()
+                )
+
+    def test_command_once(self):
+        _enqueue(5)
+        out = StringIO()
+        with mock.patch.object(threading, 'excepthook') as excepthook:
+            call_command(
+                'send_outbox', '--once', '--workers', '1',
+                '--batch-size', '2', '--interval', '0.05',
+                stdout=out, stderr=out
+            )
+        excepthook.assert_not_called()
+        assert 'Отправлено писем: 5' in out.getvalue()
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            f'{i}@yamdb.fake' for i in range(5)
+        ]
+        assert not OutboxEmail.objects.exclude(
+            status=OutboxEmail.SENT
+        ).exists()
+        out = StringIO()
+        call_command('send_outbox', '--metrics', stdout=out)
+        assert json.loads(out.getvalue())['pending'] == 0
@@ -0,0 +1,89 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Review, Title
+from users.models import Users
+
+
+def _rating(title):
+    return Title.objects.filter(pk=title.pk).values_list(
+        'rating_sum', 'rating_count', 'rating'
+    ).get()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRating:
+
+    def setup_method(self):
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.other = Title.objects.create(name='Другое', year=2001)
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(3)
+        ]
+
+    def _review(self, user, score, title=None):
+        return Review.objects.create(
+            title=title or self.title, author=user, text='Отзыв', score=score
+        )
+
+    def test_create_change_and_move(self):
+        assert _rating(self.title) == (0, 0, None)
+        first = self._review(self.users[0], 4)
+        self._review(self.users[1], 8)
+        assert _rating(self.title) == (12, 2, 6)
+        first.score = 10
+        first.save()
+        assert _rating(self.title) == (18, 2, 9)
+        first = Review.objects.get(pk=first.pk)
+        first.title = self.other
+        first.save()
+        assert _rating(self.title) == (8, 1, 8)
+        assert _rating(self.other) == (10, 1, 10)
+        assert not Title.objects.with_rating_drift().exists()
+
+    def test_delete_to_null(self):
+        first = self._review(self.users[0], 3)
+        second = self._review(self.users[1], 6)
+        first.delete()
+        assert _rating(self.title) == (6, 1, 6)
+        Review.objects.get(pk=second.pk).delete()
+        assert _rating(self.title) == (0, 0, None)
+
+    def test_cascades(self):
+        self._review(self.users[0], 2)
+        self._review(self.users[1], 9)
+        self._review(self.users[0], 5, title=self.other)
+        self.users[0].delete()
+        assert _rating(self.title) == (9, 1, 9)
+        assert _rating(self.other) == (0, 0, None)
+        self._review(self.users[2], 7, title=self.other)
+        self.title.delete()
+        assert not Review.objects.filter(title_id=self.title.pk).exists()
+        assert _rating(self.other) == (7, 1, 7)
+        assert not Title.objects.with_rating_drift().exists()
+
+    def test_stale_title_save_keeps_rating(self):
+        self._review(self.users[0], 5)
+        stale = Title.objects.get(pk=self.title.pk)
+        self._review(self.users[1], 9)
+        stale.name = 'Новое название'
+        stale.save()
+        assert _rating(self.title) == (14, 2, 7)
+        assert Title.objects.get(pk=self.title.pk).name == 'Новое название'
+
+    def test_rebuild_aggregates(self):
+        self._review(self.users[0], 5)
+        self._review(self.users[1], 7)
+        Title.objects.filter(pk=self.title.pk).update(
+            rating_sum=100, rating_count=1, rating=100
+        )
+        Title.objects.filter(pk=self.other.pk).update(rating_count=3)
+        with pytest.raises(CommandError, match='Рейтинг расходится') as error:
+            call_command('rebuild_aggregates', '--check')
+        assert 'у 2 произведений' in str(error.value)
+        call_command('rebuild_aggregates')
+        assert _rating(self.title) == (12, 2, 6)
+        assert _rating(self.other) == (0, 0, None)
+        call_command('rebuild_aggregates', '--check')
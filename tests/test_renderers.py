@@ -0,0 +1,99 @@
+import datetime
+import io
+import os
+import time
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.renderers import FastJSONParser, FastJSONRenderer
+
+BENCHMARK = os.getenv('PERF_BENCHMARK') == '1'
+
+
+def _payload(size):
+    now = timezone.now()
+    return {
+        'count': size,
+        'next': None,
+        'previous': 'http://testserver/api/v1/titles/?limit=10',
+        'results': [
+            {
+                'id': i,
+                'name': f'Произведение {i} «Война и мир»',
+                'year': 1900 + i,
+                'rating': Decimal('7.25') if i % 2 else None,
+                'description': 'Строка\u2028с разделителем\u2029и "кавычками"',
+                'genre': [{'name': 'Драма', 'slug': 'drama'}],
+                'category': {'name': 'Книга', 'slug': 'book'},
+                'pub_date': now - datetime.timedelta(days=i),
+                'date': datetime.date(2020, 1, 1 + i % 28),
+                'uuid': uuid.UUID(int=i),
+                1: 'нестроковый ключ',
+            }
+            for i in range(size)
+        ],
+    }
+
+
+class TestFastJSONRenderer:
+
+    def test_same_bytes_as_drf(self):
+        data = _payload(20)
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_and_big_integers_use_drf(self):
+        context = {'indent': 4}
+        assert FastJSONRenderer().render(
+            {'a': [1]}, renderer_context=context
+        ) == JSONRenderer().render({'a': [1]}, renderer_context=context)
+        data = {'big': 2 ** 70}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_fallback_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        data = _payload(3)
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert FastJSONParser().parse(io.BytesIO(b'{"a": 1}')) == {'a': 1}
+
+    @pytest.mark.skipif(not BENCHMARK, reason='PERF_BENCHMARK=1')
+    def test_benchmark(self, capsys):
+        data = _payload(1000)
+        timings = {}
+        for renderer in (FastJSONRenderer(), JSONRenderer()):
+            started = time.perf_counter()
+            for _ in range(20):
+                renderer.render(data)
+            timings[type(renderer).__name__] = time.perf_counter() - started
+        with capsys.disabled():
+            print('\n' + ', '.join(
+                f'{name}: {elapsed * 50:.1f} мс'
+                for name, elapsed in timings.items()
+            ))
+        assert timings['FastJSONRenderer'] < timings['JSONRenderer']
+
+
+class TestFastJSONParser:
+
+    def test_same_result_as_drf(self):
+        body = '{"name": "Отзыв", "score": 10, "items": [1.5, null]}'
+        assert FastJSONParser().parse(
+            io.BytesIO(body.encode())
+        ) == JSONParser().parse(io.BytesIO(body.encode()))
+
+    def test_invalid_json(self):
+        for body in (b'{"name": ', b'{"score": NaN}'):
+            with pytest.raises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_other_encoding_uses_drf(self):
+        body = '{"name": "Отзыв"}'.encode('cp1251')
+        assert FastJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': 'cp1251'}
+        ) == {'name': 'Отзыв'}
@@ -0,0 +1,114 @@
+import pickle
+import threading
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.cache import LRUCache
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.models import Review, Title
+from users.authentication import access_token_for
+from users.models import Users
+
+
+def _lru(name, **options):
+    cache = LRUCache(name, {'OPTIONS': options})
+    cache.clear()
+    return cache
+
+
+def _review_selects(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_review"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.author = Users.objects.create(
+            username='author', email='author@yamdb.fake'
+        )
+        Review.objects.create(
+            title=self.title, author=self.author, text='Отзыв', score=5
+        )
+        self.url = reverse(
+            'api:reviews-list', kwargs={'title_id': self.title.pk}
+        )
+        self.client = APIClient()
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        assert response.status_code == 200
+        return response.json()['results'], bool(_review_selects(context))
+
+    def test_write_invalidates_cached_page(self):
+        first, queried = self._get()
+        assert queried
+        assert self._get() == (first, False)
+        other = Users.objects.create(username='other', email='o@yamdb.fake')
+        Review.objects.create(
+            title=self.title, author=other, text='Ещё', score=7
+        )
+        results, queried = self._get()
+        assert queried
+        assert [review['author'] for review in results] == [
+            'author', 'other'
+        ]
+
+    def test_only_username_changes_invalidate_reviews(self):
+        self._get()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(self.author)}'
+        )
+        response = client.patch(
+            reverse('api:users-me'), {'bio': 'Обо мне'}, format='json'
+        )
+        assert response.status_code == 200, response.content
+        assert not self._get()[1]
+        author = Users.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.save()
+        results, queried = self._get()
+        assert queried
+        assert results[0]['author'] == 'renamed'
+
+
+class TestLRUCache:
+
+    def test_max_size_evicts_least_recently_used(self):
+        value = b'x' * 100
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        cache = _lru('test-lru-size', MAX_SIZE=3 * size)
+        for key in 'abc':
+            cache.set(key, value)
+        assert cache.get('a') == value
+        cache.set('d', value)
+        assert [key for key in 'abcd' if cache.get(key)] == ['a', 'c', 'd']
+        cache.set('big', b'x' * 4 * size)
+        assert cache.get('big') is None
+        assert [key for key in 'acd' if cache.get(key)] == []
+
+    def test_cull_everything_does_not_deadlock(self):
+        cache = _lru('test-lru-cull', MAX_ENTRIES=2, CULL_FREQUENCY=0)
+
+        def fill():
+            for key in 'abc':
+                cache.set(key, key)
+
+        thread = threading.Thread(target=fill, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert cache.get('c') == 'c'
+        assert cache.get('a') is None
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Title
+from users.models import Users
+
+DUPLICATE = {
+    'non_field_errors': ['Вы уже оставили озыв на это произведение']
+}
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def setup_method(self):
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.user = Users.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        self.url = reverse(
+            'api:reviews-list', kwargs={'title_id': self.title.pk}
+        )
+
+    def test_create_fetches_title_once(self):
+        with CaptureQueriesContext(connection) as context:
+            response = _client(self.user).post(
+                self.url, {'text': 'Отзыв', 'score': 8}
+            )
+        assert response.status_code == 201, response.content
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_title"' in query['sql']
+        ]
+        assert len(selects) == 1
+        assert not any(
+            'FROM "reviews_review"' in query['sql']
+            for query in context.captured_queries
+        )
+        self.title.refresh_from_db()
+        assert (self.title.rating_count, self.title.rating) == (1, 8)
+
+    def test_duplicate_review(self):
+        client = _client(self.user)
+        client.post(self.url, {'text': 'Отзыв', 'score': 8})
+        response = client.post(self.url, {'text': 'Ещё', 'score': 2})
+        assert response.status_code == 400
+        assert response.json() == DUPLICATE
+        self.title.refresh_from_db()
+        assert (self.title.rating_count, self.title.rating) == (1, 8)
+
+    def test_missing_title(self):
+        response = _client(self.user).post(
+            reverse('api:reviews-list', kwargs={'title_id': 999}),
+            {'text': 'Отзыв', 'score': 8},
+        )
+        assert response.status_code == 404
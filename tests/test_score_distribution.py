@@ -0,0 +1,96 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import MAX_SCORE, MIN_SCORE, Review, Title, TitleScore
+from users.models import Users
+
+
+def _distribution(title):
+    response = APIClient().get(
+        reverse('api:titles-score-distribution', kwargs={'pk': title.pk})
+    )
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def _stored(title):
+    return dict(
+        TitleScore.objects.filter(title=title).exclude(count=0).values_list(
+            'score', 'count'
+        )
+    )
+
+
+@pytest.mark.django_db
+class TestScoreDistribution:
+
+    def setup_method(self):
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.other = Title.objects.create(name='Другое', year=2001)
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(4)
+        ]
+
+    def _review(self, user, score, title=None):
+        return Review.objects.create(
+            title=title or self.title, author=user, text='Отзыв', score=score
+        )
+
+    def test_all_buckets(self):
+        self._review(self.users[0], 7)
+        self._review(self.users[1], 7)
+        self._review(self.users[2], 10)
+        data = _distribution(self.title)
+        assert data['count'] == 3
+        assert [item['score'] for item in data['scores']] == list(
+            range(MIN_SCORE, MAX_SCORE + 1)
+        )
+        counts = {item['score']: item['count'] for item in data['scores']}
+        assert counts[7] == 2 and counts[10] == 1 and counts[1] == 0
+        assert _distribution(self.other) == {
+            'count': 0,
+            'scores': [
+                {'score': score, 'count': 0}
+                for score in range(MIN_SCORE, MAX_SCORE + 1)
+            ],
+        }
+
+    def test_missing_title(self):
+        for pk in (999, 'abc'):
+            response = APIClient().get(
+                reverse('api:titles-list') + f'{pk}/score-distribution/'
+            )
+            assert response.status_code == 404
+
+    def test_counters_follow_reviews(self):
+        first = self._review(self.users[0], 5)
+        second = self._review(self.users[1], 5)
+        assert _stored(self.title) == {5: 2}
+        first.score = 9
+        first.save()
+        assert _stored(self.title) == {5: 1, 9: 1}
+        second.title = self.other
+        second.save()
+        assert _stored(self.title) == {9: 1}
+        assert _stored(self.other) == {5: 1}
+        first.delete()
+        assert _stored(self.title) == {}
+        Review.objects.filter(pk=second.pk).only('pk').get().save()
+        assert _stored(self.other) == {5: 1}
+        self.other.delete()
+        assert not TitleScore.objects.filter(title_id=self.other.pk).exists()
+
+    def test_rebuild_aggregates(self):
+        self._review(self.users[0], 3)
+        self._review(self.users[1], 8)
+        TitleScore.objects.filter(score=3).update(count=5)
+        with pytest.raises(CommandError, match='Распределение оценок'):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        assert _stored(self.title) == {3: 1, 8: 1}
+        assert TitleScore.objects.drifted_titles() == []
+        call_command('rebuild_aggregates', '--check')
@@ -0,0 +1,37 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSearch:
+
+    def _names(self, route, **params):
+        response = APIClient().get(reverse(f'api:{route}'), params)
+        assert response.status_code == 200
+        return [item['name'] for item in response.json()['results']]
+
+    def test_title_name_filter(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        Title.objects.create(name='Мастер и Маргарита', year=1967,
+                             category=category)
+        title = Title.objects.create(name='Маргаритки', year=2000,
+                                     category=category)
+        Title.objects.create(name='Война и мир', year=1869, category=category)
+        names = self._names('titles-list', name='маргарит')
+        assert sorted(names) == ['Маргаритки', 'Мастер и Маргарита']
+        title.name = 'Ромашки'
+        title.save()
+        assert self._names('titles-list', name='маргарит') == [
+            'Мастер и Маргарита'
+        ]
+        assert self._names('titles-list', name='ромаш') == ['Ромашки']
+
+    def test_search_filter(self):
+        Genre.objects.create(name='Фантастика', slug='sci-fi')
+        Genre.objects.create(name='Детектив', slug='detective')
+        assert self._names('genres-list', search='фант') == ['Фантастика']
+        Genre.objects.filter(slug='sci-fi').delete()
+        assert self._names('genres-list', search='фант') == []
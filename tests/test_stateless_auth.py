@@ -0,0 +1,132 @@
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.cache import UserCache
+from users.models import Users
+
+
+def _user_selects(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "users_users"' in query['sql']
+    ]
+
+
+def _client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestStatelessAuth:
+
+    def setup_method(self):
+        self.user = Users.objects.create(
+            username='reader', email='reader@yamdb.fake', bio='Читаю'
+        )
+        self.admin = Users.objects.create(
+            username='boss', email='boss@yamdb.fake', role=Users.ADMIN
+        )
+
+    def _token(self, user):
+        response = APIClient().post(reverse('api:token'), {
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+        assert response.status_code == 200, response.content
+        return response.json()['token']
+
+    def test_claims_and_lookups(self):
+        token = self._token(self.admin)
+        claims = AccessToken(token)
+        assert (claims['username'], claims['role']) == ('boss', 'admin')
+        assert claims['token_version'] == 0
+        client = _client(token)
+        url = reverse('api:users-list')
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(url).status_code == 200
+        first = len(_user_selects(context))
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(url).status_code == 200
+        assert len(_user_selects(context)) == first - 1
+
+    def test_lazy_fields(self):
+        client = _client(self._token(self.user))
+        url = reverse('api:users-me')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.json()['bio'] == 'Читаю'
+        assert len(_user_selects(context)) == 1
+        response = client.patch(url, {'bio': 'Пишу'}, format='json')
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'Пишу'
+        assert client.get(url).json()['bio'] == 'Пишу'
+
+    def test_role_change_revokes_tokens(self):
+        token = self._token(self.user)
+        admin = _client(self._token(self.admin))
+        response = admin.patch(
+            reverse('api:users-detail', kwargs={'username': 'reader'}),
+            {'role': 'moderator'},
+            format='json'
+        )
+        assert response.status_code == 200
+        url = reverse('api:users-me')
+        assert _client(token).get(url).status_code == 401
+        self.user.refresh_from_db()
+        assert self.user.token_version == 1
+        fresh = self._token(self.user)
+        assert AccessToken(fresh)['role'] == 'moderator'
+        assert _client(fresh).get(url).status_code == 200
+        self.user.bio = 'Не влияет на токены'
+        self.user.save()
+        assert _client(fresh).get(url).status_code == 200
+        self.user.is_active = False
+        self.user.save()
+        assert _client(fresh).get(url).status_code == 401
+
+    def test_patch_me_saves_fresh_row(self):
+        client = _client(self._token(self.admin))
+        url = reverse('api:users-me')
+        assert client.get(url).json()['bio'] == ''
+        # Другой процесс понизил роль; кэш этого процесса ещё не знает.
+        Users.objects.filter(pk=self.admin.pk).update(
+            role=Users.USER, token_version=2, first_name='Новое'
+        )
+        response = client.patch(url, {'bio': 'Пишу'}, format='json')
+        assert response.status_code == 200, response.content
+        assert Users.objects.filter(pk=self.admin.pk).values_list(
+            'role', 'token_version', 'first_name', 'bio'
+        ).get() == (Users.USER, 2, 'Новое', 'Пишу')
+        assert response.json()['role'] == Users.USER
+
+    def test_claims_user_refuses_save(self):
+        client = _client(self._token(self.user))
+        response = client.get(reverse('api:users-me'))
+        user = response.wsgi_request.user
+        with pytest.raises(TypeError):
+            user.save()
+
+    def test_legacy_token(self):
+        client = _client(AccessToken.for_user(self.user))
+        assert client.get(reverse('api:users-me')).status_code == 200
+
+
+def test_user_cache_lru():
+    cache = UserCache(size=2, timeout=30)
+    cache.set(1, {'id': 1})
+    cache.set(2, {'id': 2})
+    assert cache.get(1) == {'id': 1}
+    cache.set(3, {'id': 3})
+    assert cache.get(2) is None
+    assert cache.get(1) == {'id': 1}
+    expired = UserCache(size=2, timeout=-1)
+    expired.set(1, {'id': 1})
+    assert expired.get(1) is None
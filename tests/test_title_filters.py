@@ -0,0 +1,163 @@
+import os
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.filters import FilterTitle
+from reviews.models import Category, Genre, GenreTitle, Title
+
+BENCHMARK = os.getenv('PERF_BENCHMARK') == '1'
+
+
+def _seed():
+    books = Category.objects.create(name='Книги', slug='books')
+    films = Category.objects.create(name='Фильмы', slug='films')
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=1950 + i,
+              category=books if i % 2 else films,
+              rating=None if i % 5 == 0 else i % 10 + 0.5)
+        for i in range(40)
+    )
+
+
+def _seed_genres(titles, genres, per_title):
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(genres)
+    )
+    genre_objects = list(Genre.objects.order_by('pk'))
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000) for i in range(titles)
+    )
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre_objects[(index + step) % genres])
+        for index, title in enumerate(Title.objects.order_by('pk'))
+        for step in range(1 + index % per_title)
+    )
+
+
+def _get(query):
+    response = APIClient().get(reverse('api:titles-list') + query)
+    assert response.status_code == 200, response.content[:300]
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestTitleFilters:
+
+    def test_ranges(self):
+        _seed()
+        results = _get('?rating_min=7&rating_max=9&limit=100')['results']
+        assert results
+        assert all(7 <= title['rating'] <= 9 for title in results)
+        results = _get('?year_min=1960&year_max=1964&limit=100')['results']
+        assert sorted(title['year'] for title in results) == list(
+            range(1960, 1965)
+        )
+        assert _get('?rating=8&limit=100')['count'] == Title.objects.filter(
+            rating__gte=8, rating__lt=9
+        ).count()
+
+    def test_top_in_category(self):
+        _seed()
+        data = _get('?category=books&rating_min=6&ordering=-rating&limit=3')
+        expected = Title.objects.filter(
+            category__slug='books', rating__gte=6
+        ).order_by('-rating', 'pk')
+        assert data['count'] == expected.count()
+        assert [title['id'] for title in data['results']] == [
+            title.pk for title in expected[:3]
+        ]
+
+    def test_rating_ordering_uses_index(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется на SQLite')
+        _seed()
+        with CaptureQueriesContext(connection) as context:
+            _get('?category=books&rating_min=6&ordering=-rating&limit=3')
+        sql = next(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'ORDER BY' in query['sql']
+            and '"reviews_title"."rating"' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'title_category_rating_idx' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_genres_any_and_all(self):
+        _seed_genres(30, 6, 3)
+        expected_any, expected_all = set(), set()
+        for title in Title.objects.prefetch_related('genre'):
+            slugs = {genre.slug for genre in title.genre.all()}
+            if slugs & {'genre-1', 'genre-2'}:
+                expected_any.add(title.pk)
+            if slugs >= {'genre-1', 'genre-2'}:
+                expected_all.add(title.pk)
+        for query, expected in (
+            ('?genre=genre-1,genre-2', expected_any),
+            ('?genre=genre-1, genre-2,&genre_mode=any', expected_any),
+            ('?genre=genre-2,genre-1&genre_mode=all', expected_all),
+        ):
+            data = _get(query + '&limit=100')
+            ids = [title['id'] for title in data['results']]
+            assert len(ids) == len(set(ids)) == data['count'], query
+            assert set(ids) == expected, query
+        assert expected_all and expected_all < expected_any
+        response = APIClient().get(
+            reverse('api:titles-list') + '?genre=genre-1&genre_mode=some'
+        )
+        assert response.status_code == 400
+
+    def test_genre_filter_without_distinct(self):
+        _seed_genres(10, 4, 3)
+        with CaptureQueriesContext(connection) as context:
+            _get('?genre=genre-1,genre-2&genre_mode=all')
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'IN (SELECT' in sql
+        assert 'DISTINCT' not in sql
+
+    @pytest.mark.skipif(not BENCHMARK, reason='PERF_BENCHMARK=1')
+    def test_benchmark(self, capsys):
+        _seed_genres(20000, 50, 12)
+        slugs = ['genre-1', 'genre-2', 'genre-3']
+
+        def joined(mode):
+            queryset = Title.objects.all()
+            if mode == 'any':
+                return queryset.filter(genre__slug__in=slugs).distinct()
+            for slug in slugs:
+                queryset = queryset.filter(genre__slug=slug)
+            return queryset.distinct()
+
+        def exists(mode):
+            return FilterTitle(
+                {'genre': ','.join(slugs), 'genre_mode': mode},
+                queryset=Title.objects.all(),
+            ).qs
+
+        def measure(build, mode):
+            started = time.perf_counter()
+            for _ in range(5):
+                queryset = build(mode)
+                queryset.count()
+                list(queryset.order_by('pk')[:20])
+            return (time.perf_counter() - started) / 5
+
+        rows = [
+            (mode, measure(exists, mode), measure(joined, mode))
+            for mode in ('any', 'all')
+        ]
+        with capsys.disabled():
+            for mode, fast, slow in rows:
+                print(f'\ngenre_mode={mode}: полусоединение '
+                      f'{fast * 1000:.1f} мс, '
+                      f'JOIN + DISTINCT {slow * 1000:.1f} мс', end='')
+            print()
+        assert exists('all').count() == joined('all').count()
+        assert exists('any').count() == joined('any').count()
@@ -0,0 +1,188 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleActivity
+)
+from reviews.signals import deferred_aggregates
+from users.models import Users
+
+
+def _trending(query=''):
+    response = APIClient().get(reverse('api:titles-trending') + query)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def _buckets():
+    return sorted(TitleActivity.objects.exclude(
+        reviews=0, comments=0
+    ).values_list('title_id', 'start', 'hours', 'reviews', 'comments'))
+
+
+@pytest.mark.django_db
+class TestTrending:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.quiet = Title.objects.create(name='Тихое', year=2000)
+        self.hot = Title.objects.create(name='Горячее', year=2000)
+        self.users = [
+            Users.objects.create(username=f'user-{i}', email=f'{i}@yamdb.fake')
+            for i in range(3)
+        ]
+        self.review = Review.objects.create(
+            title=self.quiet, author=self.users[0], text='Отзыв', score=5
+        )
+        for user in self.users:
+            review = Review.objects.create(
+                title=self.hot, author=user, text='Отзыв', score=7
+            )
+        self.comment = Comment.objects.create(
+            review=review, author=self.users[0], text='Ок'
+        )
+
+    def test_ranking(self):
+        data = _trending()
+        assert data['count'] == 2
+        first, second = data['results']
+        assert first['title']['name'] == 'Горячее'
+        assert (first['activity'], first['reviews'], first['comments']) == (
+            4, 3, 1
+        )
+        assert second['title']['id'] == self.quiet.pk
+        assert _trending('?limit=1')['results'][0]['activity'] == 4
+
+    def test_windows(self):
+        TitleActivity.objects.create(
+            title=self.quiet,
+            start=timezone.now() - timedelta(days=3),
+            hours=TitleActivity.DAY,
+            reviews=10,
+        )
+        assert _trending()['results'][0]['title']['name'] == 'Горячее'
+        data = _trending('?window=7d')
+        assert data['results'][0]['title']['name'] == 'Тихое'
+        assert data['results'][0]['activity'] == 11
+        response = APIClient().get(
+            reverse('api:titles-trending') + '?window=1y'
+        )
+        assert response.status_code == 400
+
+    def test_comment_without_loaded_review(self):
+        comment = Comment(
+            review_id=self.review.pk, author=self.users[1], text='Ещё'
+        )
+        with CaptureQueriesContext(connection) as context:
+            comment.save()
+        assert not any(
+            query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql'].split('WHERE')[0]
+            for query in context.captured_queries
+        )
+        assert TitleActivity.objects.filter(
+            title=self.quiet, comments=1
+        ).exists()
+
+    def test_deletes(self):
+        self.comment.delete()
+        self.review.delete()
+        data = _trending()
+        assert [item['activity'] for item in data['results']] == [3, 0]
+
+    def test_deferred_deletes(self):
+        with transaction.atomic(), deferred_aggregates():
+            Review.objects.filter(title=self.hot).delete()
+        assert [
+            (title_id, reviews, comments)
+            for title_id, _, _, reviews, comments in _buckets()
+        ] == [(self.quiet.pk, 1, 0)]
+
+    def test_compact_and_rebuild(self):
+        now = timezone.now()
+        Review.objects.filter(pk=self.review.pk).update(
+            pub_date=now - timedelta(days=4)
+        )
+        Comment.objects.update(pub_date=now - timedelta(days=40))
+        TitleActivity.objects.rebuild()
+        rebuilt = _buckets()
+        assert {bucket[2] for bucket in rebuilt} == {1, 24}
+        assert sum(bucket[4] for bucket in rebuilt) == 0
+        TitleActivity.objects.all().delete()
+        Review.objects.filter(pk=self.review.pk).update(pub_date=now)
+        TitleActivity.objects.record(self.quiet.pk, now, reviews=1)
+        TitleActivity.objects.record(
+            self.quiet.pk, now - timedelta(days=4), reviews=1
+        )
+        TitleActivity.objects.record(
+            self.hot.pk, now - timedelta(days=40), comments=1
+        )
+        assert TitleActivity.objects.compact(now) == 1
+        assert sorted(
+            TitleActivity.objects.values_list('title_id', 'hours', 'reviews')
+        ) == [(self.quiet.pk, 1, 1), (self.quiet.pk, 24, 1)]
+        call_command('compact_activity')
+        call_command('compact_activity', '--rebuild')
+        assert {bucket[2] for bucket in _buckets()} == {1}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTrendingCache:
+
+    def setup_method(self):
+        caches[API_CACHE_ALIAS].clear()
+        self.title = Title.objects.create(name='Произведение', year=2000)
+        self.user = Users.objects.create(
+            username='user', email='user@yamdb.fake'
+        )
+        self.review = Review.objects.create(
+            title=self.title, author=self.user, text='Отзыв', score=5
+        )
+
+    def test_cached_until_write(self):
+        first = _trending()
+        with CaptureQueriesContext(connection) as context:
+            assert _trending() == first
+        assert not any(
+            'reviews_titleactivity' in query['sql']
+            for query in context.captured_queries
+        )
+        assert _trending('?window=7d')['count'] == 1
+        Comment.objects.create(
+            review=self.review, author=self.user, text='Ещё'
+        )
+        data = _trending()
+        assert [item['activity'] for item in data['results']] == [2]
+
+    def test_rename_genre_or_category(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        Title.objects.filter(pk=self.title.pk).update(category=category)
+        self.title.genre.set([genre])
+        caches[API_CACHE_ALIAS].clear()
+        title = _trending()['results'][0]['title']
+        assert title['category']['name'] == 'Фильм'
+        category.name = 'Кино'
+        category.save()
+        assert _trending()['results'][0]['title']['category']['name'] == (
+            'Кино'
+        )
+        genre.name = 'Трагедия'
+        genre.save()
+        assert _trending()['results'][0]['title']['genre'] == [
+            {'name': 'Трагедия', 'slug': 'drama'}
+        ]
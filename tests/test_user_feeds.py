@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Comment, Review, Title
+from users.models import Users
+
+
+@pytest.mark.django_db
+class TestUserFeeds:
+
+    def setup_method(self):
+        self.titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000)
+            for i in range(25)
+        ]
+        self.user = Users.objects.create(
+            username='reader', email='reader@yamdb.fake'
+        )
+        self.other = Users.objects.create(
+            username='other', email='other@yamdb.fake'
+        )
+        self.admin = Users.objects.create(
+            username='boss', email='boss@yamdb.fake', role=Users.ADMIN
+        )
+        self.reviews = [
+            Review.objects.create(
+                title=title, author=self.user, text='Отзыв', score=5
+            )
+            for title in self.titles
+        ]
+        other_review = Review.objects.create(
+            title=self.titles[0], author=self.other, text='Чужой', score=3
+        )
+        self.comment = Comment.objects.create(
+            review=other_review, author=self.user, text='Ок'
+        )
+        Comment.objects.create(
+            review=self.reviews[0], author=self.other, text='Чужой'
+        )
+
+    def _get(self, user, route, username='me', query=''):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        url = reverse(f'api:{route}', kwargs={'username': username})
+        return client.get(url + query)
+
+    def test_my_reviews_newest_first(self):
+        response = self._get(self.user, 'user-reviews-list')
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}
+        expected = [review.pk for review in reversed(self.reviews)][:10]
+        assert [item['id'] for item in data['results']] == expected
+        assert data['results'][0]['title'] == self.titles[-1].pk
+
+    def test_my_comments(self):
+        data = self._get(self.user, 'user-comments-list').json()
+        assert data['results'] == [{
+            'id': self.comment.pk,
+            'text': 'Ок',
+            'author': 'reader',
+            'pub_date': data['results'][0]['pub_date'],
+            'review': self.comment.review_id,
+            'title': self.titles[0].pk,
+        }]
+
+    def test_permissions(self):
+        route = 'user-reviews-list'
+        assert self._get(None, route).status_code == 401
+        assert self._get(self.other, route, 'reader').status_code == 403
+        response = self._get(self.admin, route, 'reader')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 10
+        assert self._get(self.admin, route, 'nobody').status_code == 404
+
+    def test_pages_cost_the_same(self):
+        seen, costs = [], []
+        url = reverse(
+            'api:user-reviews-list', kwargs={'username': 'me'}
+        ) + '?limit=2'
+        client = APIClient()
+        client.force_authenticate(self.user)
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                data = client.get(url).json()
+            costs.append(len(context.captured_queries))
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert seen == [review.pk for review in reversed(self.reviews)]
+        assert len(costs) == 13 and set(costs) == {1}
+
+    def test_feed_uses_author_index(self):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется только на SQLite')
+        queryset = Review.objects.filter(author=self.user).order_by(
+            '-pub_date', '-pk'
+        )
+        plan = queryset.explain()
+        assert 'review_author_pub_date_idx' in plan
+        assert 'TEMP B-TREE' not in plan
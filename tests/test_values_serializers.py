@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from api_yamdb.settings import API_CACHE_ALIAS
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import Users
+
+BENCHMARK = os.getenv('PERF_BENCHMARK') == '1'
+PAGE_SIZES = (10, 100, 1000)
+VIEWSETS = (TitleViewSet, ReviewViewSet, CommentViewSet)
+
+
+def seed_catalogue(size):
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(5)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=1900 + i % 120,
+              category=categories[i % 4] if i % 4 < 3 else None,
+              description='Описание' if i % 2 else None)
+        for i in range(size)
+    )
+    titles = list(Title.objects.order_by('pk'))
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for index, title in enumerate(titles)
+        for genre in genres[index % 3:index % 3 + 1 + index % 2]
+    )
+    Users.objects.bulk_create(
+        Users(username=f'user-{i}', email=f'user-{i}@yamdb.fake')
+        for i in range(size)
+    )
+    users = list(Users.objects.order_by('pk'))
+    title = titles[0]
+    for index, user in enumerate(users):
+        Review.objects.create(
+            title=title, author=user, text='Отзыв', score=1 + index % 10
+        )
+    review = title.reviews.order_by('pk').first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=user, text='Комментарий')
+        for user in users
+    )
+    return {'title_id': title.pk, 'review_id': review.pk}
+
+
+def _urls(ids, limit):
+    return (
+        reverse('api:titles-list') + f'?limit={limit}',
+        reverse('api:titles-list') + f'?limit={limit}&ordering=-rating',
+        reverse('api:titles-list') + f'?limit={limit}&pagination=cursor',
+        reverse('api:reviews-list', kwargs={'title_id': ids['title_id']})
+        + f'?limit={limit}',
+        reverse('api:comments-list', kwargs=ids)
+        + f'?limit={limit}&pagination=cursor',
+    )
+
+
+def _get(url, fast):
+    saved = [viewset.values_serializer_class for viewset in VIEWSETS]
+    if not fast:
+        for viewset in VIEWSETS:
+            viewset.values_serializer_class = None
+    try:
+        caches[API_CACHE_ALIAS].clear()
+        started = time.perf_counter()
+        response = APIClient().get(url)
+        elapsed = time.perf_counter() - started
+    finally:
+        for viewset, serializer_class in zip(VIEWSETS, saved):
+            viewset.values_serializer_class = serializer_class
+    assert response.status_code == 200, response.content[:300]
+    return response.content, elapsed
+
+
+@pytest.mark.django_db
+class TestValuesSerializers:
+
+    def test_same_bytes_as_serializers(self):
+        ids = seed_catalogue(30)
+        for url in _urls(ids, 25):
+            assert _get(url, fast=True)[0] == _get(url, fast=False)[0], url
+
+    @pytest.mark.skipif(not BENCHMARK, reason='PERF_BENCHMARK=1')
+    def test_benchmark(self, capsys):
+        ids = seed_catalogue(max(PAGE_SIZES))
+        rows = []
+        for limit in PAGE_SIZES:
+            for url in _urls(ids, limit):
+                fast = min(_get(url, fast=True)[1] for _ in range(3))
+                slow = min(_get(url, fast=False)[1] for _ in range(3))
+                rows.append((url, fast, slow))
+        with capsys.disabled():
+            for url, fast, slow in rows:
+                print(f'\n{url}: values() {fast * 1000:.1f} мс, '
+                      f'сериализатор {slow * 1000:.1f} мс, '
+                      f'x{slow / fast:.1f}', end='')
+            print()
+        assert all(fast <= slow * 1.2 for _, fast, slow in rows)